@@ -27,8 +27,9 @@ WITH results AS (
         results.campo_sample_number, 
         results.translated_standard_parameter, 
         results.numeric_result, 
-        results.unit_pad
+        results.unit_pad,
+        ss.field_id
     FROM postgres.analytics_marts_v2.soil_samples ss
     JOIN results 
         ON lower(replace(ss.label, ' ', '')) = results.hga_code_cleaned
-    WHERE ss.field_id = {field_id}
\ No newline at end of file
+    WHERE ss.field_id = ANY(:field_ids)
\ No newline at end of file
@@ -0,0 +1,41 @@
+-- Field-first version of agbenefits_get_NoNcomposite_samples.sql
+-- The field's soil samples are selected before they are joined to the lab tables,
+-- and only the 14 columns the app uses are read instead of car.*.
+WITH field_samples AS (
+        SELECT 
+            ss.point_id, 
+            lower(replace(ss.label, ' ', '')) AS hga_code_cleaned, 
+            ss.plot_type, 
+            ss.sample_long_lat,
+            ss.point_long_lat,
+            ss.sampling_plan_campaign_number, 
+            ss.sampling_plan_purpose, 
+            ss.depth_range_top_m, 
+            ss.depth_range_bottom_m, 
+            ss.plot_name_from_overlap,
+            ss.field_id
+        FROM postgres.analytics_marts_v2.soil_samples ss
+        WHERE ss.field_id = ANY(:field_ids)
+    )
+
+    SELECT 
+        fs.point_id, 
+        fs.hga_code_cleaned, 
+        fs.plot_type, 
+        fs.sample_long_lat,
+        fs.point_long_lat,
+        fs.sampling_plan_campaign_number, 
+        fs.sampling_plan_purpose, 
+        fs.depth_range_top_m, 
+        fs.depth_range_bottom_m, 
+        fs.plot_name_from_overlap,
+        cas.sample_number AS campo_sample_number, 
+        car.translated_standard_parameter, 
+        car.numeric_result, 
+        car.unit_pad,
+        fs.field_id
+    FROM field_samples fs
+    JOIN postgres.lab_results.campo_integ__analysis_sample cas 
+        ON lower(replace(cas.hga_code, ' ', '')) = fs.hga_code_cleaned
+    JOIN postgres.lab_results.campo_integ__analysis_result car
+        ON car.analysis_sample_id = cas.id
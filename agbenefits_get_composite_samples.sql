@@ -79,7 +79,8 @@ final AS (
         r.campo_sample_number, 
         r.translated_standard_parameter, 
         r.numeric_result, 
-        r.unit_pad
+        r.unit_pad,
+        csd.field_id
         -- csd.point_id,
         -- csd.plot_type,
         -- csd.sampling_plan_campaign_number,
@@ -95,7 +96,7 @@ final AS (
     FROM composite_sample_data AS csd
     INNER JOIN results AS r
         ON csd.join_key = r.join_key
-    WHERE csd.field_id = {field_id}
+    WHERE csd.field_id = ANY(:field_ids)
 )
 SELECT 
    -- point_id,  
@@ -123,5 +124,6 @@ SELECT
    campo_sample_number, 
    translated_standard_parameter, 
    numeric_result, 
-   unit_pad
+   unit_pad,
+   field_id
 FROM final;
\ No newline at end of file
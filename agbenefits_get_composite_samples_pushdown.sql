@@ -0,0 +1,63 @@
+-- Field-first version of agbenefits_get_composite_samples.sql
+-- The field filter is applied to the soil samples before any join, the join key is
+-- only extracted from lab samples (not from every analysis result row), analysis
+-- results are only read for the lab samples of the field's composites, and only the
+-- 14 columns the app uses are selected.
+WITH field_composite_samples AS (
+    SELECT DISTINCT
+        css.id,
+        -- this is a scientific label: FARM-FIELD-CAMPAIGN_NUMBER-BOTTOM_DEPTH-POINT_ID-CS1
+        -- this is the unique part being isolated: -CAMPAIGN_NUMBER-BOTTOM_DEPTH-POINT_ID-CS
+        REGEXP_SUBSTR(css.label, '(-[0-9]+-[0-9]+-[0-9]+-CS)') AS join_key,
+        ss.point_id,
+        ss.plot_type,
+        ss.sample_long_lat,
+        ss.point_long_lat,
+        ss.sampling_plan_campaign_number,
+        ss.sampling_plan_purpose,
+        ss.depth_range_top_m,
+        ss.depth_range_bottom_m,
+        ss.plot_name_from_overlap,
+        ss.field_id
+    FROM postgres.analytics_marts_v2.soil_samples AS ss
+    INNER JOIN
+        postgres.public.composite_soil_sample_to_soil_sample AS csstss
+        ON (ss.sample_id = csstss.soil_sample_id)
+    INNER JOIN
+        postgres.public.composite_soil_samples AS css
+        ON (csstss.composite_soil_sample_id = css.id)
+    WHERE ss.field_id = ANY(:field_ids)
+),
+field_lab_samples AS (
+    SELECT
+        cas.id,
+        cas.sample_number AS campo_sample_number,
+        lower(replace(cas.hga_code, ' ', '')) AS hga_code_cleaned,
+        REGEXP_SUBSTR(cas.hga_code, '(-[0-9]+-[0-9]+-[0-9]+-CS)') AS join_key
+    FROM postgres.lab_results.campo_integ__analysis_sample AS cas
+    WHERE REGEXP_SUBSTR(cas.hga_code, '(-[0-9]+-[0-9]+-[0-9]+-CS)') IN (
+        SELECT join_key FROM field_composite_samples
+    )
+)
+SELECT
+   fcs.point_id,
+   fls.hga_code_cleaned,
+   fcs.plot_type,
+   fcs.sample_long_lat,
+   fcs.point_long_lat,
+   fcs.sampling_plan_campaign_number,
+   fcs.sampling_plan_purpose,
+   fcs.depth_range_top_m,
+   fcs.depth_range_bottom_m,
+   fcs.plot_name_from_overlap,
+   fls.campo_sample_number,
+   car.translated_standard_parameter,
+   car.numeric_result,
+   car.unit_pad,
+   fcs.field_id
+FROM field_composite_samples AS fcs
+INNER JOIN field_lab_samples AS fls
+    ON fcs.join_key = fls.join_key
+INNER JOIN
+    postgres.lab_results.campo_integ__analysis_result AS car
+    ON (car.analysis_sample_id = fls.id);
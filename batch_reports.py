@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Headless batch report generator for many fields
+
+Loads each field's soil samples and boundaries from the database, classifies
+them and writes the PDF, DOCX and Excel reports without the Streamlit app.
+Fields are processed in a process pool. Every finished field is appended to
+progress.jsonl in the output directory, so an interrupted run picks up where
+it stopped, and a per-field timing summary is printed (and written to
+timings.csv) at the end. Run it from the repository directory, where the
+SQL queries are read from. With FIELD_SNAPSHOT_DIR set, field data comes from
+local Parquet snapshots while they are current (see utils/snapshots.py).
+
+Usage:
+    python batch_reports.py 101 102 103 --output-dir reports
+    python batch_reports.py --fields-file field_ids.txt --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+REPORT_FORMATS = ('pdf', 'docx', 'xlsx')
+PROGRESS_FILE = "progress.jsonl"
+TIMINGS_FILE = "timings.csv"
+TIMING_STEPS = ('load', 'classify', 'pdf', 'docx', 'xlsx')
+
+
+def read_field_ids(field_ids, fields_file=None):
+    """Field ids from the command line and/or a file (one per line or comma separated, # comments)"""
+    values = list(field_ids)
+    if fields_file:
+        with open(fields_file, 'r') as file:
+            for line in file:
+                values.extend(line.split('#', 1)[0].replace(',', ' ').split())
+
+    # Keep the given order, dropping duplicates
+    return list(dict.fromkeys(int(value) for value in values))
+
+
+def load_progress(output_dir):
+    """Latest progress record per field id from previous runs"""
+    progress = {}
+    path = Path(output_dir) / PROGRESS_FILE
+    if not path.exists():
+        return progress
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Line cut short by an interrupted run
+            progress[record['field_id']] = record
+    return progress
+
+
+def record_progress(output_dir, record):
+    """Append one field's result to the progress file"""
+    with open(Path(output_dir) / PROGRESS_FILE, 'a') as file:
+        file.write(json.dumps(record) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def is_complete(record, output_dir):
+    """Whether a previous run finished this field and its reports are still there"""
+    return (record is not None and record.get('status') == 'done'
+            and all((Path(output_dir) / name).exists() for name in record.get('outputs', [])))
+
+
+def write_output(path, content):
+    """Write a report atomically so an interrupted run never leaves a partial file"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def generate_field_reports(field_id, output_dir, formats=REPORT_FORMATS, param_col='translated_standard_parameter',
+                           result_col='numeric_result', geom_col='sample_long_lat', crs='EPSG:4326',
+                           project_name=None, language='pt', query_variant=None):
+    """Load, classify and write the reports of one field; returns its progress record"""
+    # Imported here so only worker processes pay for the report dependencies
+    import pandas as pd
+    from dotenv import load_dotenv
+    import soil_core
+    from utils.spatial import prepare_field
+
+    load_dotenv()
+    timings = {}
+    record = {'field_id': field_id, 'status': 'failed', 'outputs': [], 'timings': timings}
+    started = time.perf_counter()
+
+    try:
+        step = time.perf_counter()
+        soil_samples_df = soil_core.load_soil_samples_for_fields([field_id], variant=query_variant).data[field_id]
+        if soil_samples_df.empty:
+            record['error'] = "No soil samples found"
+            return record
+        points_gdf = soil_core.prepare_database_samples(soil_samples_df, param_col, result_col, geom_col, crs)
+        if points_gdf is None or points_gdf.empty:
+            record['error'] = "Failed to process geometry data"
+            return record
+        polygon_gdf = soil_core.load_field_boundaries_for_fields([field_id]).data[field_id]
+        if polygon_gdf is not None:
+            polygon_gdf = prepare_field(points_gdf, polygon_gdf).polygons
+        timings['load'] = time.perf_counter() - step
+
+        # Same table the app classifies: geometry kept as text
+        step = time.perf_counter()
+        df = pd.DataFrame(points_gdf.copy())
+        df['geometry'] = df['geometry'].astype(str)
+        classifier = soil_core.SoilClassifier()
+        classified_df = classifier.classify_dataframe(df, 'Parameter', 'Result')
+        summary_stats = soil_core.create_classification_summary(classified_df)
+        timings['classify'] = time.perf_counter() - step
+
+        project_name = project_name or f"Field {field_id}"
+        report_args = dict(points_gdf=points_gdf, polygon_gdf=polygon_gdf, classifier=classifier,
+                           param_col='Parameter', value_col='Result', max_workers=1, language=language)
+        for report_format in formats:
+            step = time.perf_counter()
+            if report_format == 'pdf':
+                content = soil_core.generate_pdf_report(classified_df, summary_stats, None, project_name, **report_args)
+            elif report_format == 'docx':
+                content = soil_core.generate_docx_report(classified_df, summary_stats, None, project_name, **report_args)
+            else:
+                content = soil_core.generate_excel_report(classified_df, 'Parameter', 'Result', language=language,
+                                                         classifier=classifier)
+
+            name = f"field_{field_id}_report.{report_format}"
+            write_output(Path(output_dir) / name, content)
+            record['outputs'].append(name)
+            timings[report_format] = time.perf_counter() - step
+
+        record['status'] = 'done'
+        record['samples'] = len(points_gdf)
+        return record
+
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+
+    finally:
+        timings['total'] = time.perf_counter() - started
+        record['finished_at'] = datetime.now().isoformat(timespec='seconds')
+
+
+def print_summary(records):
+    """Per-field timing table"""
+    header = ['field_id', 'status'] + list(TIMING_STEPS) + ['total']
+    print(" | ".join(f"{name:>9}" for name in header))
+    print("-" * (12 * len(header) - 3))
+    for record in records:
+        timings = record.get('timings', {})
+        row = [str(record['field_id']), record['status']]
+        row += [f"{timings[step]:.1f}s" if step in timings else "-" for step in TIMING_STEPS + ('total',)]
+        print(" | ".join(f"{value:>9}" for value in row))
+        if record.get('error'):
+            print(f"    {record['error']}")
+
+
+def write_timings(output_dir, records):
+    """Write the per-field timings of this run as CSV"""
+    with open(Path(output_dir) / TIMINGS_FILE, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['field_id', 'status', 'samples'] + list(TIMING_STEPS) + ['total', 'error'])
+        for record in records:
+            timings = record.get('timings', {})
+            writer.writerow([record['field_id'], record['status'], record.get('samples', '')]
+                            + [round(timings[step], 3) if step in timings else '' for step in TIMING_STEPS + ('total',)]
+                            + [record.get('error', '')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate soil reports for many fields without the Streamlit app")
+    parser.add_argument("field_ids", nargs="*", help="field ids to report on")
+    parser.add_argument("--fields-file", help="file with field ids (one per line or comma separated)")
+    parser.add_argument("--output-dir", default="reports", help="directory for the reports and progress file")
+    parser.add_argument("--formats", default=",".join(REPORT_FORMATS),
+                        help=f"comma separated report formats (default {','.join(REPORT_FORMATS)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="fields processed in parallel")
+    parser.add_argument("--language", choices=['pt', 'en'], default='pt', help="report language")
+    parser.add_argument("--force", action="store_true", help="regenerate fields already finished by a previous run")
+    parser.add_argument("--param-col", default="translated_standard_parameter", help="parameter name column")
+    parser.add_argument("--result-col", default="numeric_result", help="numeric result column")
+    parser.add_argument("--geometry-col", default="sample_long_lat", help="sample geometry column")
+    parser.add_argument("--crs", default="EPSG:4326", help="CRS of the sample geometries")
+    parser.add_argument("--query-variant", choices=['full', 'pushdown'],
+                        help="sample SQL variant (default from SAMPLE_QUERY_VARIANT, else full)")
+    args = parser.parse_args()
+
+    field_ids = read_field_ids(args.field_ids, args.fields_file)
+    if not field_ids:
+        parser.error("no field ids given")
+    formats = [value.strip().lower() for value in args.formats.split(",") if value.strip()]
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown report formats: {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    progress = {} if args.force else load_progress(args.output_dir)
+    pending = [field_id for field_id in field_ids if not is_complete(progress.get(field_id), args.output_dir)]
+    print(f"{len(field_ids)} fields, {len(field_ids) - len(pending)} already done, {len(pending)} to generate")
+
+    field_args = dict(output_dir=args.output_dir, formats=formats, param_col=args.param_col,
+                      result_col=args.result_col, geom_col=args.geometry_col, crs=args.crs,
+                      language=args.language, query_variant=args.query_variant)
+    records = []
+    started = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(max(1, args.workers), len(pending))) as executor:
+            futures = {executor.submit(generate_field_reports, field_id, **field_args): field_id
+                       for field_id in pending}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {'field_id': futures[future], 'status': 'failed', 'error': str(e)}
+                record_progress(args.output_dir, record)
+                records.append(record)
+                print(f"[{len(records)}/{len(pending)}] field {record['field_id']}: {record['status']}"
+                      f" in {record.get('timings', {}).get('total', 0):.1f}s")
+
+    records.sort(key=lambda record: field_ids.index(record['field_id']))
+    print()
+    print_summary(records)
+    write_timings(args.output_dir, records)
+
+    failed = [record['field_id'] for record in records if record['status'] != 'done']
+    print(f"\nFinished in {time.perf_counter() - started:.1f}s, {len(records) - len(failed)} generated,"
+          f" {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
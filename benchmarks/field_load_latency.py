@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Load test: per-field latency of loading soil samples from the database.
+
+Loads many fields one after another (or --workers at a time) through
+soil_core.retrieve_soil_samples_for_fields, the same path the app and batch
+reports use, and reports latency percentiles per pass. --batch N loads N fields
+per request with the bulk field_id = ANY(:field_ids) queries, as the app does
+for a farm; latencies are then per request. With the fields bound as the
+:field_ids array parameter every request runs the same statement text, whatever
+fields and however many it loads, so later passes show what statement reuse buys; compare DB_DRIVER=psycopg2 with DB_DRIVER=psycopg
+(server-side prepared statements). The connection comes from the DB_* variables
+used by the app.
+
+Usage:
+    python benchmarks/field_load_latency.py 101 102 103 --passes 3
+    python benchmarks/field_load_latency.py --sample 200 --workers 4 --variant full
+    python benchmarks/field_load_latency.py --sample 200 --batch 40
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+SAMPLE_FIELDS_QUERY = """
+SELECT DISTINCT field_id
+FROM postgres.analytics_marts_v2.soil_samples
+WHERE field_id IS NOT NULL
+ORDER BY field_id
+LIMIT :limit
+"""
+
+
+def sample_field_ids(count):
+    """The first `count` field ids that have soil samples"""
+    from utils.db import read_pd_from_db_sql, terradot_db_session
+
+    with terradot_db_session() as session:
+        fields_df = read_pd_from_db_sql(SAMPLE_FIELDS_QUERY, session, params={'limit': count})
+    return [int(value) for value in fields_df['field_id']]
+
+
+def load_fields(field_ids, variant):
+    """Latency in seconds, row count and error of loading some fields in one request"""
+    import soil_core
+
+    started = time.perf_counter()
+    try:
+        partitions = soil_core.retrieve_soil_samples_for_fields(field_ids, variant=variant)
+        rows = sum(len(field_df) for field_df in partitions.values())
+        return time.perf_counter() - started, rows, None
+    except Exception as e:
+        return time.perf_counter() - started, 0, str(e)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_pass(field_ids, variant, workers, batch):
+    """Load every field once, `batch` fields per request; returns (latencies, rows, errors, wall seconds)"""
+    requests = [field_ids[start:start + batch] for start in range(0, len(field_ids), batch)]
+    started = time.perf_counter()
+    # The per-query sample counts printed by soil_core would drown the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda request: load_fields(request, variant), requests))
+    wall = time.perf_counter() - started
+    latencies = [latency for latency, _, error in results if error is None]
+    errors = [error for _, _, error in results if error is not None]
+    return latencies, sum(rows for _, rows, _ in results), errors, wall
+
+
+def main():
+    """Parse arguments and run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("field_ids", nargs="*", type=int, help="fields to load")
+    parser.add_argument("--sample", type=int, help="load the first N fields that have samples instead")
+    parser.add_argument("--passes", type=int, default=3, help="times every field is loaded")
+    parser.add_argument("--workers", type=int, default=1, help="requests run at the same time")
+    parser.add_argument("--batch", type=int, default=1, help="fields loaded per request")
+    parser.add_argument("--variant", choices=['full', 'pushdown'], help="sample SQL variant")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from utils.db import DB_DRIVER, get_pool_metrics
+
+    load_dotenv(REPO_DIR / ".env")
+    field_ids = args.field_ids or (sample_field_ids(args.sample) if args.sample else [])
+    if not field_ids:
+        parser.error("give field ids or --sample N")
+
+    print(f"{len(field_ids)} fields, {args.batch} per request, {args.workers} workers, driver {DB_DRIVER},"
+          f" variant {args.variant or 'default'}")
+    print(f"{'pass':>4} {'fields/s':>9} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+          f" {'rows':>8} {'errors':>6}")
+    for number in range(1, args.passes + 1):
+        latencies, rows, errors, wall = run_pass(field_ids, args.variant, args.workers, max(1, args.batch))
+        if latencies:
+            figures = [statistics.mean(latencies), percentile(latencies, 0.5), percentile(latencies, 0.95),
+                       percentile(latencies, 0.99), max(latencies)]
+            timing = " ".join(f"{value * 1000:>8.1f}" for value in figures)
+        else:
+            timing = " ".join(f"{'-':>8}" for _ in range(5))
+        print(f"{number:>4} {len(field_ids) / wall:>9.1f} {timing} {rows:>8} {len(errors):>6}")
+        for error in sorted(set(errors))[:3]:
+            print(f"     {error}")
+
+    print(f"pool: {get_pool_metrics()['status']}")
+
+
+if __name__ == "__main__":
+    main()
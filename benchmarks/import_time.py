@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cold-start cost of the Streamlit app.
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+The script reports the time to import the app module and the time of its first
+script run (what a new session waits for before the language selector shows),
+plus which heavy dependencies that first run loaded. Point --source at another
+checkout (e.g. one made with ``git worktree add /tmp/before HEAD~1``) to
+compare before/after numbers.
+
+Usage: python benchmarks/import_time.py [--repeat 5] [--source /tmp/before]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_FILE = "streamlit_soil_report.py"
+
+# Dependencies that should only load when a tab or button needs them
+HEAVY_MODULES = ("geopandas", "matplotlib.pyplot", "plotly.express", "scipy.stats", "pykrige",
+                 "reportlab.platypus", "docx", "openpyxl", "rasterio", "sqlalchemy")
+
+# Streamlit itself is loaded before timing: it is paid once per server, not per session
+MEASURE_SCRIPT = """
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {source!r})
+start = time.perf_counter()
+if {first_run!r}:
+    AppTest.from_file({app!r}, default_timeout=120).run()
+else:
+    import streamlit_soil_report
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(source, first_run):
+    """Time one import or first script run of the app in a fresh interpreter"""
+    script = MEASURE_SCRIPT.format(source=str(source), app=str(Path(source) / APP_FILE),
+                                   first_run=first_run, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", script], cwd=source, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(source, repeat):
+    """Report median import and first-run times and the heavy modules they load"""
+    print(f"source: {source}")
+    print(f"{'measurement':>12} {'median s':>9} {'min s':>7}  heavy modules loaded")
+    for label, first_run in (("import", False), ("first run", True)):
+        results = [measure(source, first_run) for _ in range(repeat)]
+        times = [result['seconds'] for result in results]
+        loaded = ", ".join(results[-1]['loaded']) or "-"
+        print(f"{label:>12} {statistics.median(times):>9.2f} {min(times):>7.2f}  {loaded}")
+
+
+def main():
+    """Parse arguments and run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=str(Path(__file__).resolve().parent.parent),
+                        help="Checkout containing the app (default: this repository)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    run_benchmark(Path(args.source).resolve(), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
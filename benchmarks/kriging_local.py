@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark local (moving-window) kriging against global kriging on synthetic fields.
+
+Each synthetic field is a smooth trend plus noise sampled at random points.
+For every point count the script reports the runtime of both modes, the RMSE
+and maximum absolute difference of the local surface against the global one,
+and how many grid cells fall into the same classification range.
+
+Usage: python benchmarks/kriging_local.py [--points 300 1000 2000] [--grid-res 100]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.classification import CompiledRanges
+from utils.kriging import LOCAL_KRIGING_NEIGHBORS, kriging_interpolation, local_kriging_interpolation
+
+# Calcium-like ranges so the class agreement reflects what the maps show
+BENCHMARK_RANGES = CompiledRanges([
+    (0, 2, "Muito Baixo"),
+    (2, 4, "Baixo"),
+    (4, 7, "Médio"),
+    (7, 10, "Alto"),
+    (10, 100, "Muito Alto"),
+])
+
+
+def make_synthetic_field(n_points, seed=0, extent=1000.0):
+    """Random sample locations over a smooth trend with one bump and noise"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, extent, n_points)
+    y = rng.uniform(0, extent, n_points)
+    z = (2
+         + 6 * x / extent
+         + 4 * np.exp(-((x - 0.3 * extent) ** 2 + (y - 0.6 * extent) ** 2) / (0.3 * extent) ** 2)
+         + rng.normal(0, 0.3, n_points))
+    return x, y, z, extent
+
+
+def run_benchmark(point_counts, grid_res, n_neighbors, tile_workers):
+    """Time both kriging modes on each synthetic field and compare the surfaces"""
+    print(f"{'points':>8} {'global s':>10} {'local s':>10} {'speedup':>8} {'rmse':>8} {'max diff':>9} {'same class':>11}")
+    for n_points in point_counts:
+        x, y, z, extent = make_synthetic_field(n_points)
+
+        start = time.perf_counter()
+        _, _, global_zi = kriging_interpolation(x, y, z, 0, extent, 0, extent, grid_res=grid_res,
+                                                n_neighbors=n_points)
+        global_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, _, local_zi = local_kriging_interpolation(x, y, z, 0, extent, 0, extent, grid_res=grid_res,
+                                                     n_neighbors=n_neighbors, tile_workers=tile_workers)
+        local_time = time.perf_counter() - start
+
+        global_zi = np.ma.getdata(global_zi)
+        diff = local_zi - global_zi
+        rmse = np.sqrt(np.mean(diff ** 2))
+        same_class = np.mean(BENCHMARK_RANGES.classify(local_zi) == BENCHMARK_RANGES.classify(global_zi))
+
+        print(f"{n_points:>8} {global_time:>10.2f} {local_time:>10.2f} {global_time / local_time:>7.1f}x "
+              f"{rmse:>8.3f} {np.abs(diff).max():>9.3f} {same_class:>10.1%}")
+
+
+def main():
+    """Parse arguments and run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[300, 1000, 2000],
+                        help="Number of sample points for each synthetic field")
+    parser.add_argument("--grid-res", type=int, default=100, help="Grid cells per side")
+    parser.add_argument("--neighbors", type=int, default=LOCAL_KRIGING_NEIGHBORS, help="Nearest points per tile probe")
+    parser.add_argument("--tile-workers", type=int, default=None, help="Threads for local kriging tiles")
+    args = parser.parse_args()
+
+    run_benchmark(args.points, args.grid_res, args.neighbors, args.tile_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Compare the plans of the sample query variants with EXPLAIN ANALYZE.
+
+Runs the composite and non-composite queries of every variant in
+soil_core.SAMPLE_QUERY_VARIANTS for one field and reports planning and
+execution time, shared buffers touched, the planner's cost estimate and the
+row count (which must agree between variants). The queries use
+database-qualified names (postgres.<schema>.<table>), so the database must be
+named ``postgres``.
+
+--create-fixture fills a local scratch database with synthetic tables of the
+same shape (composite and non-composite samples, --parameters results per lab
+sample). It only ever replaces tables it created itself. The connection comes
+from --url or the DB_* variables used by the app.
+
+Usage:
+    python benchmarks/sample_query_plans.py --url postgresql+psycopg2://postgres@localhost/postgres --create-fixture
+    python benchmarks/sample_query_plans.py --field-id 7 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+FIXTURE_COMMENT = "sample query benchmark fixture"
+FIXTURE_TABLES = ("analytics_marts_v2.soil_samples", "public.composite_soil_sample_to_soil_sample",
+                  "public.composite_soil_samples", "lab_results.campo_integ__analysis_sample",
+                  "lab_results.campo_integ__analysis_result")
+
+# One composite and one non-composite lab sample per field, point and depth; each
+# composite is made of three soil samples. Join keys follow the scientific labels
+# FARM-FIELD-CAMPAIGN_NUMBER-BOTTOM_DEPTH-POINT_ID-CS1.
+FIXTURE_SQL = """
+CREATE SCHEMA IF NOT EXISTS analytics_marts_v2;
+CREATE SCHEMA IF NOT EXISTS lab_results;
+DROP TABLE IF EXISTS {tables};
+
+CREATE TEMPORARY TABLE fixture_points AS
+SELECT field_id, (field_id - 1) * {points} + point AS point_id, depth * 20 AS depth_cm,
+       'FARM' || field_id || '-FIELD' || field_id || '-1-' || depth * 20 || '-' || ((field_id - 1) * {points} + point)
+           AS label_stem
+FROM generate_series(1, {fields}) AS field_id, generate_series(1, {points}) AS point,
+     generate_series(1, {depths}) AS depth;
+
+CREATE TABLE analytics_marts_v2.soil_samples AS
+SELECT row_number() OVER () AS sample_id, samples.*,
+       now() AS sample_taken_timestamp, false AS sample_is_bulk_density, 'plan' AS sampling_plan_name,
+       'baseline' AS sampling_plan_purpose, 1 AS sampling_plan_campaign_number,
+       now() AS sampling_plan_date_generated, 'POINT(-47.1 -22.9)' AS sample_long_lat,
+       'Field ' || samples.field_id AS field_name, 'treatment' AS plot_type, samples.field_id AS plot_id,
+       samples.field_id AS farm_id, 'Farm ' || samples.field_id AS farm_name,
+       (samples.depth_cm - 20) / 100.0 AS depth_range_top_m, samples.depth_cm / 100.0 AS depth_range_bottom_m,
+       'POINT(-47.1 -22.9)' AS point_long_lat, now() AS point_valid_end, now() AS point_valid_start,
+       samples.field_id AS sampling_plan_id, samples.field_id AS sampling_plan_field_id,
+       'Field' AS sampling_plan_field_name, samples.field_id AS sampling_plan_farm_id,
+       'Farm' AS sampling_plan_farm_name, samples.field_id AS field_id_from_overlap,
+       'Field' AS field_name_from_overlap, samples.field_id AS farm_id_from_overlap,
+       'Farm' AS farm_name_from_overlap, 10.0 AS plot_area_ha, 'Farm-Field' AS farm_and_field,
+       'Field-plan' AS field_sampling_plan, 'Plot ' || samples.field_id AS plot_name_from_overlap
+FROM (
+    SELECT field_id, point_id, depth_cm, label_stem || '-SS' || part AS label, label_stem, true AS in_composite
+    FROM fixture_points, generate_series(1, 3) AS part
+    UNION ALL
+    SELECT field_id, point_id, depth_cm, label_stem || '-NC', label_stem, false
+    FROM fixture_points
+) AS samples;
+
+CREATE TABLE public.composite_soil_samples AS
+SELECT row_number() OVER () AS id, label_stem || '-CS' AS label FROM fixture_points;
+
+CREATE TABLE public.composite_soil_sample_to_soil_sample AS
+SELECT css.id AS composite_soil_sample_id, ss.sample_id AS soil_sample_id
+FROM public.composite_soil_samples AS css
+JOIN analytics_marts_v2.soil_samples AS ss ON ss.in_composite AND ss.label_stem || '-CS' = css.label;
+
+CREATE TABLE lab_results.campo_integ__analysis_sample AS
+SELECT row_number() OVER () AS id, hga_code, 'R' || field_id AS report_id, 'soil' AS matrix,
+       now() AS last_update, row_number() OVER () AS sample_number, now() AS so_start_date
+FROM (SELECT field_id, label_stem || '-CS1' AS hga_code FROM fixture_points
+      UNION ALL
+      SELECT field_id, label_stem || '-NC' FROM fixture_points) AS lab_samples;
+
+CREATE TABLE lab_results.campo_integ__analysis_result AS
+SELECT row_number() OVER () AS id, cas.id AS analysis_sample_id,
+       'Parameter ' || parameter AS translated_standard_parameter, random() * 100 AS numeric_result,
+       'mg/dm3' AS unit_pad, 'lab' AS lab_name, now() AS analysed_at, 'raw' AS raw_result
+FROM lab_results.campo_integ__analysis_sample AS cas, generate_series(1, {parameters}) AS parameter;
+
+ALTER TABLE analytics_marts_v2.soil_samples DROP COLUMN label_stem, DROP COLUMN in_composite;
+ALTER TABLE analytics_marts_v2.soil_samples ADD PRIMARY KEY (sample_id);
+ALTER TABLE public.composite_soil_samples ADD PRIMARY KEY (id);
+ALTER TABLE lab_results.campo_integ__analysis_sample ADD PRIMARY KEY (id);
+ALTER TABLE lab_results.campo_integ__analysis_result ADD PRIMARY KEY (id);
+CREATE INDEX ON analytics_marts_v2.soil_samples (field_id);
+CREATE INDEX ON public.composite_soil_sample_to_soil_sample (soil_sample_id);
+CREATE INDEX ON lab_results.campo_integ__analysis_result (analysis_sample_id);
+"""
+
+
+def fixture_owned(connection):
+    """Whether every fixture table is missing or was created by this script"""
+    for table in FIXTURE_TABLES:
+        exists = connection.exec_driver_sql(f"SELECT to_regclass('{table}') IS NOT NULL").scalar()
+        if exists:
+            comment = connection.exec_driver_sql(f"SELECT obj_description('{table}'::regclass, 'pg_class')").scalar()
+            if comment != FIXTURE_COMMENT:
+                return False
+    return True
+
+
+def create_fixture(engine, fields, points, depths, parameters):
+    """Replace the fixture tables with synthetic data and analyze them"""
+    with engine.begin() as connection:
+        if not fixture_owned(connection):
+            raise SystemExit("Refusing to replace tables that were not created by this benchmark")
+        connection.exec_driver_sql(FIXTURE_SQL.format(tables=", ".join(FIXTURE_TABLES), fields=fields,
+                                                      points=points, depths=depths, parameters=parameters))
+        for table in FIXTURE_TABLES:
+            connection.exec_driver_sql(f"COMMENT ON TABLE {table} IS '{FIXTURE_COMMENT}'")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("ANALYZE " + ", ".join(FIXTURE_TABLES))
+    print(f"fixture: {fields} fields x {points} points x {depths} depths, {parameters} results per lab sample")
+
+
+def explain(engine, query, params):
+    """Plan summary of one EXPLAIN (ANALYZE, BUFFERS) run"""
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        plan = connection.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    top = root['Plan']
+    return {
+        'planning_ms': root['Planning Time'],
+        'execution_ms': root['Execution Time'],
+        'buffers': top.get('Shared Hit Blocks', 0) + top.get('Shared Read Blocks', 0),
+        'cost': top['Total Cost'],
+        'rows': top['Actual Rows'],
+    }
+
+
+def run_benchmark(engine, field_id, repeat):
+    """Report the median plan figures of each variant's queries for one field"""
+    from soil_core import SAMPLE_QUERY_VARIANTS, read_query
+
+    print(f"field {field_id}, median of {repeat} runs")
+    print(f"{'variant':>9} {'query':>13} {'rows':>7} {'plan ms':>8} {'exec ms':>9} {'buffers':>8} {'cost':>10}")
+    params = {'field_ids': [field_id]}
+    medians = {}
+    for variant, files in SAMPLE_QUERY_VARIANTS.items():
+        for kind, path in zip(("composite", "non-composite"), files):
+            query = read_query(REPO_DIR / path)
+            explain(engine, query, params)  # Warm the cache so every variant reads the same pages
+            runs = [explain(engine, query, params) for _ in range(repeat)]
+            result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            medians[variant, kind] = result
+            print(f"{variant:>9} {kind:>13} {result['rows']:>7.0f} {result['planning_ms']:>8.2f}"
+                  f" {result['execution_ms']:>9.2f} {result['buffers']:>8.0f} {result['cost']:>10.1f}")
+
+    for kind in ("composite", "non-composite"):
+        full, pushdown = medians.get(('full', kind)), medians.get(('pushdown', kind))
+        if full and pushdown:
+            speedup = full['execution_ms'] / max(pushdown['execution_ms'], 1e-6)
+            rows = "same rows" if full['rows'] == pushdown['rows'] else "ROW COUNTS DIFFER"
+            print(f"{kind}: pushdown {speedup:.1f}x faster, {rows}")
+
+
+def main():
+    """Parse arguments, optionally build the fixture and run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SQLAlchemy database URL (default: DB_* variables)")
+    parser.add_argument("--field-id", type=int, default=1, help="field to query")
+    parser.add_argument("--repeat", type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    parser.add_argument("--create-fixture", action="store_true", help="(re)create the synthetic fixture tables")
+    parser.add_argument("--fields", type=int, default=500, help="fixture fields")
+    parser.add_argument("--points", type=int, default=30, help="fixture sampling points per field")
+    parser.add_argument("--depths", type=int, default=2, help="fixture sampling depths per point")
+    parser.add_argument("--parameters", type=int, default=20, help="fixture results per lab sample")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+    from utils.db import get_terradot_database_url
+
+    load_dotenv(REPO_DIR / ".env")
+    url = args.url or get_terradot_database_url()
+    if url is None:
+        parser.error("no database configured: pass --url or set DB_HOST, DB_NAME and DB_USER")
+    engine = create_engine(url)
+
+    if args.create_fixture:
+        create_fixture(engine, args.fields, args.points, args.depths, args.parameters)
+    run_benchmark(engine, args.field_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
 SELECT *
 FROM postgres.analytics_boundary_marts.marts_current_field_boundaries
-WHERE field_id = {field_id};
\ No newline at end of file
+WHERE field_id = ANY(:field_ids);
\ No newline at end of file
@@ -8,4 +8,4 @@ where valid_end is null)
 select * 
 from current_plots
 join analytics_base.stg_farms_and_fields using(field_id)
-where field_id = {field_id}
\ No newline at end of file
+where field_id = ANY(:field_ids)
\ No newline at end of file
@@ -0,0 +1,50 @@
+-- Data version of each field's soil samples, used to refresh local snapshots:
+-- the latest update of the field's lab samples (sample_last_updated_at) and the
+-- number of analysis result rows joined to them, composite and non-composite
+WITH field_composite_samples AS (
+    SELECT DISTINCT
+        css.id,
+        REGEXP_SUBSTR(css.label, '(-[0-9]+-[0-9]+-[0-9]+-CS)') AS join_key,
+        ss.field_id
+    FROM postgres.analytics_marts_v2.soil_samples AS ss
+    INNER JOIN
+        postgres.public.composite_soil_sample_to_soil_sample AS csstss
+        ON (ss.sample_id = csstss.soil_sample_id)
+    INNER JOIN
+        postgres.public.composite_soil_samples AS css
+        ON (csstss.composite_soil_sample_id = css.id)
+    WHERE ss.field_id = ANY(:field_ids)
+),
+field_lab_samples AS (
+    SELECT
+        cas.id,
+        cas.last_update,
+        REGEXP_SUBSTR(cas.hga_code, '(-[0-9]+-[0-9]+-[0-9]+-CS)') AS join_key
+    FROM postgres.lab_results.campo_integ__analysis_sample AS cas
+    WHERE REGEXP_SUBSTR(cas.hga_code, '(-[0-9]+-[0-9]+-[0-9]+-CS)') IN (
+        SELECT join_key FROM field_composite_samples
+    )
+),
+sample_rows AS (
+    SELECT fcs.field_id, fls.last_update
+    FROM field_composite_samples AS fcs
+    INNER JOIN field_lab_samples AS fls
+        ON fcs.join_key = fls.join_key
+    INNER JOIN
+        postgres.lab_results.campo_integ__analysis_result AS car
+        ON (car.analysis_sample_id = fls.id)
+    UNION ALL
+    SELECT ss.field_id, cas.last_update
+    FROM postgres.analytics_marts_v2.soil_samples ss
+    JOIN postgres.lab_results.campo_integ__analysis_sample cas
+        ON lower(replace(cas.hga_code, ' ', '')) = lower(replace(ss.label, ' ', ''))
+    JOIN postgres.lab_results.campo_integ__analysis_result car
+        ON car.analysis_sample_id = cas.id
+    WHERE ss.field_id = ANY(:field_ids)
+)
+SELECT
+    field_id,
+    max(last_update) AS sample_last_updated_at,
+    count(*) AS sample_rows
+FROM sample_rows
+GROUP BY field_id;
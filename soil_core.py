@@ -0,0 +1,2543 @@
+"""
+Soil report computation core
+
+Classification, statistics, charts, kriging map jobs and PDF/DOCX/Excel report
+generation, free of Streamlit so they run headless and in worker processes.
+Everything that shows text takes the report language explicitly ('pt' or
+'en'), and errors are raised to the caller instead of being rendered; the
+Streamlit app in streamlit_soil_report.py is a thin interface over this module.
+
+Plotting, geospatial, kriging and report libraries are imported inside the
+functions that use them, so importing this module (and with it starting the
+app) only costs pandas and numpy.
+"""
+import pandas as pd
+import numpy as np
+import io
+import os
+import hashlib
+from datetime import datetime
+import binascii
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+# Vectorized classification helpers
+from utils.classification import CompiledRanges, coerce_values, classify_grid
+
+# Translations dictionary
+TRANSLATIONS = {
+    'pt': {
+        'page_title': 'Relatório de Classificação de Solo',
+        'main_title': '🌱 Relatório de Classificação de Solo',
+        'subtitle': '### Sistema de Análise e Classificação Automatizada',
+        'language': 'Idioma',
+        'settings': '⚙️ Configurações',
+        'upload_file': '📁 Upload do arquivo de dados',
+        'upload_help': 'Faça upload do arquivo Excel ou CSV com os dados de solo. Arquivos em inglês serão automaticamente traduzidos!',
+        'project_name': '📝 Nome do Projeto',
+        'project_help': 'Nome que aparecerá no relatório',
+        'default_project': 'Análise de Solo',
+        'file_loaded': '✅ Arquivo carregado com sucesso!',
+        'lines_found': 'linhas encontradas.',
+        'data_preview': '👀 Prévia dos Dados',
+        'columns_available': '**Colunas disponíveis:**',
+        'column_mapping': '🔧 Mapeamento de Colunas',
+        'parameter_column': 'Coluna de Parâmetros',
+        'parameter_help': 'Selecione a coluna que contém os nomes dos parâmetros',
+        'value_column': 'Coluna de Valores',
+        'value_help': 'Selecione a coluna que contém os valores numéricos',
+        'custom_parameters': '🎯 Parâmetros Customizados',
+        'add_custom': 'Adicione parâmetros personalizados:',
+        'parameter_name': 'Nome do Parâmetro',
+        'parameter_type': 'Tipo',
+        'add_parameter': '➕ Adicionar Parâmetro',
+        'parameter_added': 'Parâmetro \'{}\' adicionado!',
+        'run_classification': '🚀 Executar Classificação',
+        'processing': 'Processando classificação...',
+        'classification_completed': '✅ Classificação concluída!',
+        'total_samples': '📊 Total de Amostras',
+        'predominant_class': '🏆 Classificação Predominante',
+        'unique_parameters': '🧪 Parâmetros Únicos',
+        'visualizations': '📈 Visualizações',
+        'classification_summary': 'Resumo das Classificações',
+        'samples': 'Número de Amostras',
+        'advanced_analysis': '🔬 Análise Estatística Avançada',
+        'select_parameter': 'Selecione um parâmetro para análise:',
+        'group_by': 'Agrupar por:',
+        'group_help': 'Escolha uma coluna para agrupar a análise',
+        'distribution': '📊 Distribuição',
+        'box_plot': '📈 Box Plot',
+        'statistics': '📋 Estatísticas',
+        'comparison': '⚖️ Comparação',
+        'box_plot_unavailable': 'Box plot não disponível para esta combinação',
+        'statistical_summary': '📊 Resumo Estatístico',
+        'select_grouping': 'Selecione colunas para agrupamento:',
+        'grouping_help': 'Escolha uma ou mais colunas para calcular estatísticas agrupadas',
+        'download_stats': '📥 Download Estatísticas (CSV)',
+        'no_stats_available': 'Nenhuma estatística disponível para este parâmetro com o agrupamento selecionado',
+        'select_one_column': 'Selecione pelo menos uma coluna para agrupamento',
+        'comparison_between_groups': '⚖️ Comparação entre Grupos',
+        'compare_by': 'Comparar por:',
+        'statistic': 'Estatística:',
+        'mean': 'Média',
+        'std': 'Desvio Padrão',
+        'median': 'Mediana',
+        'numerical_values': 'Valores Numéricos:',
+        'classification_breakdown': '📋 Detalhamento das Classificações',
+        'statistical_overview': '📊 Visão Geral Estatística',
+        'complete_statistics': '🔍 Estatísticas Completas por Grupo',
+        'select_stat_groups': 'Selecione colunas para agrupamento estatístico:',
+        'stat_groups_help': 'Estatísticas serão calculadas para cada combinação das colunas selecionadas',
+        'complete_stats_table': '📈 Tabela de Estatísticas Completa',
+        'download_complete_stats': '📥 Download Estatísticas Completas (CSV)',
+        'parameter_summary': '🎯 Resumo por Parâmetro',
+        'no_grouping_columns': 'Nenhuma coluna disponível para agrupamento. Certifique-se de que seu arquivo contém colunas categóricas como \'Tratamento\', \'Tempo\', etc.',
+        'classified_data': '📋 Dados Classificados',
+        'pdf_report_generation': '📄 Geração de Relatório PDF',
+        'generate_pdf': '📄 Gerar Relatório PDF',
+        'generating_pdf': 'Gerando relatório PDF...',
+        'pdf_generated': '✅ Relatório PDF gerado com sucesso!',
+        'download_pdf': '📥 Download do Relatório PDF',
+        'pdf_error': '❌ Erro ao gerar PDF:',
+        'generate_docx': '📝 Gerar Relatório DOCX',
+        'generating_docx': 'Gerando relatório DOCX...',
+        'docx_generated': '✅ Relatório DOCX gerado com sucesso!',
+        'download_docx': '📥 Download do Relatório DOCX',
+        'docx_error': '❌ Erro ao gerar DOCX:',
+        'download_excel': '📊 Download Excel',
+        'upload_instructions': '👆 Faça upload de um arquivo na barra lateral para começar',
+        'instructions': '📋 Instruções de Uso:',
+        'step1': '**Upload do Arquivo**: Carregue um arquivo Excel (.xlsx) ou CSV com seus dados de solo',
+        'step2': '**Mapeamento**: Selecione as colunas corretas para parâmetros e valores',
+        'step3': '**Configuração**: (Opcional) Adicione parâmetros customizados',
+        'step4': '**Classificação**: Execute a classificação automática',
+        'step5': '**Análise**: Visualize os resultados em gráficos e tabelas',
+        'step6': '**Relatório**: Gere um relatório PDF profissional',
+        'expected_format': '📊 Formato do Arquivo Esperado:',
+        'format_description': 'O arquivo deve conter pelo menos duas colunas:',
+        'parameter_col_desc': '**Coluna de Parâmetros**: Nome dos parâmetros (ex: "pH em CaCl2", "Matéria Orgânica")',
+        'value_col_desc': '**Coluna de Valores**: Valores numéricos correspondentes',
+        'supported_classifications': '🎯 Classificações Suportadas:',
+        'mb_mbom': '**MB → MBom**: Muito Baixo → Muito Bom (para macronutrientes)',
+        'b_malto': '**B → MAlto**: Baixo → Muito Alto (para micronutrientes/pH)',
+        # Classification levels
+        'Muito Baixo': 'Muito Baixo',
+        'Baixo': 'Baixo',
+        'Médio': 'Médio',
+        'Bom': 'Bom',
+        'Muito Bom': 'Muito Bom',
+        'Alto': 'Alto',
+        'Muito Alto': 'Muito Alto',
+        'Classificação não definida': 'Classificação não definida',
+        'Valor inválido': 'Valor inválido'
+    },
+    'en': {
+        'page_title': 'Soil Classification Report',
+        'main_title': '🌱 Soil Classification Report',
+        'subtitle': '### Automated Analysis and Classification System',
+        'language': 'Language',
+        'settings': '⚙️ Settings',
+        'upload_file': '📁 Upload data file',
+        'upload_help': 'Upload Excel or CSV file with soil data. English files will be automatically translated!',
+        'project_name': '📝 Project Name',
+        'project_help': 'Name that will appear in the report',
+        'default_project': 'Soil Analysis',
+        'file_loaded': '✅ File loaded successfully!',
+        'lines_found': 'lines found.',
+        'data_preview': '👀 Data Preview',
+        'columns_available': '**Available columns:**',
+        'column_mapping': '🔧 Column Mapping',
+        'parameter_column': 'Parameter Column',
+        'parameter_help': 'Select the column containing parameter names',
+        'value_column': 'Value Column',
+        'value_help': 'Select the column containing numerical values',
+        'custom_parameters': '🎯 Custom Parameters',
+        'add_custom': 'Add custom parameters:',
+        'parameter_name': 'Parameter Name',
+        'parameter_type': 'Type',
+        'add_parameter': '➕ Add Parameter',
+        'parameter_added': 'Parameter \'{}\' added!',
+        'run_classification': '🚀 Run Classification',
+        'processing': 'Processing classification...',
+        'classification_completed': '✅ Classification completed!',
+        'total_samples': '📊 Total Samples',
+        'predominant_class': '🏆 Predominant Classification',
+        'unique_parameters': '🧪 Unique Parameters',
+        'visualizations': '📈 Visualizations',
+        'classification_summary': 'Classification Summary',
+        'samples': 'Number of Samples',
+        'advanced_analysis': '🔬 Advanced Statistical Analysis',
+        'select_parameter': 'Select a parameter for analysis:',
+        'group_by': 'Group by:',
+        'group_help': 'Choose a column to group the analysis',
+        'distribution': '📊 Distribution',
+        'box_plot': '📈 Box Plot',
+        'statistics': '📋 Statistics',
+        'comparison': '⚖️ Comparison',
+        'box_plot_unavailable': 'Box plot not available for this combination',
+        'statistical_summary': '📊 Statistical Summary',
+        'select_grouping': 'Select columns for grouping:',
+        'grouping_help': 'Choose one or more columns to calculate grouped statistics',
+        'download_stats': '📥 Download Statistics (CSV)',
+        'no_stats_available': 'No statistics available for this parameter with selected grouping',
+        'select_one_column': 'Select at least one column for grouping',
+        'comparison_between_groups': '⚖️ Comparison between Groups',
+        'compare_by': 'Compare by:',
+        'statistic': 'Statistic:',
+        'mean': 'Mean',
+        'std': 'Standard Deviation',
+        'median': 'Median',
+        'numerical_values': 'Numerical Values:',
+        'classification_breakdown': '📋 Classification Breakdown',
+        'statistical_overview': '📊 Statistical Overview',
+        'complete_statistics': '🔍 Complete Statistics by Group',
+        'select_stat_groups': 'Select columns for statistical grouping:',
+        'stat_groups_help': 'Statistics will be calculated for each combination of selected columns',
+        'complete_stats_table': '📈 Complete Statistics Table',
+        'download_complete_stats': '📥 Download Complete Statistics (CSV)',
+        'parameter_summary': '🎯 Summary by Parameter',
+        'no_grouping_columns': 'No columns available for grouping. Make sure your file contains categorical columns like \'Treatment\', \'Time\', etc.',
+        'classified_data': '📋 Classified Data',
+        'pdf_report_generation': '📄 PDF Report Generation',
+        'generate_pdf': '📄 Generate PDF Report',
+        'generating_pdf': 'Generating PDF report...',
+        'pdf_generated': '✅ PDF report generated successfully!',
+        'download_pdf': '📥 Download PDF Report',
+        'pdf_error': '❌ Error generating PDF:',
+        'generate_docx': '📝 Generate DOCX Report',
+        'generating_docx': 'Generating DOCX report...',
+        'docx_generated': '✅ DOCX report generated successfully!',
+        'download_docx': '📥 Download DOCX Report',
+        'docx_error': '❌ Error generating DOCX:',
+        'download_excel': '📊 Download Excel',
+        'upload_instructions': '👆 Upload a file in the sidebar to start',
+        'instructions': '📋 Usage Instructions:',
+        'step1': '**File Upload**: Upload an Excel (.xlsx) or CSV file with your soil data',
+        'step2': '**Mapping**: Select the correct columns for parameters and values',
+        'step3': '**Configuration**: (Optional) Add custom parameters',
+        'step4': '**Classification**: Run automatic classification',
+        'step5': '**Analysis**: View results in charts and tables',
+        'step6': '**Report**: Generate a professional PDF report',
+        'expected_format': '📊 Expected File Format:',
+        'format_description': 'The file should contain at least two columns:',
+        'parameter_col_desc': '**Parameter Column**: Parameter names (e.g., "pH in CaCl2", "Organic Matter")',
+        'value_col_desc': '**Value Column**: Corresponding numerical values',
+        'supported_classifications': '🎯 Supported Classifications:',
+        'mb_mbom': '**MB → MBom**: Very Low → Very Good (for macronutrients)',
+        'b_malto': '**B → MAlto**: Low → Very High (for micronutrients/pH)',
+        # Classification levels
+        'Muito Baixo': 'Very Low',
+        'Baixo': 'Low',
+        'Médio': 'Medium',
+        'Bom': 'Good',
+        'Muito Bom': 'Very Good',
+        'Alto': 'High',
+        'Muito Alto': 'Very High',
+        'Classificação não definida': 'Classification not defined',
+        'Valor inválido': 'Invalid value'
+    }
+}
+
+# Language mapping for statistics
+STAT_NAMES = {
+    'pt': {'mean': 'Média', 'std': 'Desvio Padrão', 'median': 'Mediana'},
+    'en': {'mean': 'Mean', 'std': 'Standard Deviation', 'median': 'Median'    }
+}
+
+def translate(key, language='pt'):
+    """Translation function"""
+    return TRANSLATIONS[language].get(key, key)
+
+# SQL queries that load fields, relative to the working directory; the fields are
+# bound as the :field_ids array parameter (field_id = ANY(:field_ids)) so the query
+# text is the same for every field and a whole farm loads with one query each
+COMPOSITE_SAMPLES_QUERY = "agbenefits_get_composite_samples.sql"
+NONCOMPOSITE_SAMPLES_QUERY = "agbenefits_get_NoNcomposite_samples.sql"
+BOUNDARIES_QUERY = "get_plot_boundaries.sql"
+SAMPLE_VERSIONS_QUERY = "get_sample_versions.sql"
+
+# (composite, non-composite) query files of each sample query variant: 'full' runs
+# the pipeline queries as written, 'pushdown' filters by field before the joins and
+# selects only the columns the app uses (see benchmarks/sample_query_plans.py).
+# 'pushdown' is opt-in until its row counts are checked against 'full' on the real
+# database: its narrower SELECT DISTINCT may merge rows the full query keeps apart
+SAMPLE_QUERY_VARIANTS = {
+    'full': (COMPOSITE_SAMPLES_QUERY, NONCOMPOSITE_SAMPLES_QUERY),
+    'pushdown': ("agbenefits_get_composite_samples_pushdown.sql", "agbenefits_get_NoNcomposite_samples_pushdown.sql"),
+}
+DEFAULT_SAMPLE_QUERY_VARIANT = os.getenv("SAMPLE_QUERY_VARIANT", "full")
+
+# Rows per chunk when sample queries are streamed from a server-side cursor (0
+# loads each result in one go). Chunks from iter_soil_samples_for_fields are
+# converted to the compact SAMPLE_DTYPES as they arrive; the report path keeps the
+# database types, since float32 results show up as 5.19999980926 in statistics and
+# exports and categorical columns change how the summaries group
+SAMPLE_STREAM_CHUNKSIZE = int(os.getenv("SAMPLE_STREAM_CHUNKSIZE", "0"))
+SAMPLE_DTYPES = {
+    'translated_standard_parameter': 'category',
+    'unit_pad': 'category',
+    'plot_type': 'category',
+    'sampling_plan_purpose': 'category',
+    'numeric_result': 'float32',
+}
+
+@lru_cache(maxsize=None)
+def read_query(path):
+    """Text of a SQL query file, read once per process"""
+    with open(path, 'r') as file:
+        return file.read()
+
+def sample_query_files(variant=None):
+    """(composite, non-composite) query files of a sample query variant (default from SAMPLE_QUERY_VARIANT)"""
+    variant = variant or DEFAULT_SAMPLE_QUERY_VARIANT
+    if variant not in SAMPLE_QUERY_VARIANTS:
+        raise ValueError(f"Unknown sample query variant '{variant}', expected one of: {', '.join(SAMPLE_QUERY_VARIANTS)}")
+    return SAMPLE_QUERY_VARIANTS[variant]
+
+def read_db_query(query, params=None, chunksize=None):
+    """
+    Run one query with bound parameters on its own pooled connection and return the DataFrame
+    
+    With a chunksize (default SAMPLE_STREAM_CHUNKSIZE) the rows are streamed
+    through a server-side cursor; their types are the same as without one.
+    """
+    # Import the local database utilities
+    from utils.db import read_pd_from_db_sql, terradot_db_session
+    
+    chunksize = SAMPLE_STREAM_CHUNKSIZE if chunksize is None else chunksize
+    with terradot_db_session() as connection:
+        if chunksize:
+            return read_pd_from_db_sql(query, connection, params=params, chunksize=chunksize)
+        return read_pd_from_db_sql(query, connection, params=params)
+
+def field_id_list(field_ids):
+    """Field ids as distinct ints, in the given order"""
+    return list(dict.fromkeys(int(field_id) for field_id in field_ids))
+
+def partition_by_field(df, field_ids):
+    """{field_id: rows of that field} for every requested field, None for fields without rows"""
+    partitions = {}
+    if not df.empty:
+        for field_id, field_df in df.groupby('field_id', sort=False):
+            partitions[int(field_id)] = field_df.reset_index(drop=True)
+    return {field_id: partitions.get(field_id) for field_id in field_ids}
+
+def retrieve_soil_samples_for_fields(field_ids, variant=None, chunksize=None):
+    """
+    Retrieve the soil samples of many fields at once using agbenefits pipeline method
+    
+    One composite and one non-composite query cover every field, run concurrently
+    on separate pooled connections. `variant` picks the SQL (see
+    SAMPLE_QUERY_VARIANTS) and `chunksize` streams the results (see
+    read_db_query). Returns {field_id: DataFrame} for every requested field, with
+    an empty DataFrame for fields without samples; database errors are raised.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.db import concat_chunks
+    
+    field_ids = field_id_list(field_ids)
+    if not field_ids:
+        return {}
+    
+    # Read SQL queries
+    composite_file, noncomposite_file = sample_query_files(variant)
+    composite_query = read_query(composite_file)
+    noncomposite_query = read_query(noncomposite_file)
+    params = {'field_ids': field_ids}
+    
+    # Execute both queries at once; each waits on Postgres, not on the GIL
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        composite_future = executor.submit(read_db_query, composite_query, params, chunksize)
+        noncomposite_future = executor.submit(read_db_query, noncomposite_query, params, chunksize)
+        composite_df = composite_future.result()
+        noncomposite_df = noncomposite_future.result()
+    print(f"Number of composite samples: {len(composite_df)}")
+    print(f"Number of non-composite samples: {len(noncomposite_df)}")
+    
+    # Combine results (same logic as agbenefits pipeline)
+    if len(composite_df) != 0 and len(noncomposite_df) != 0:
+        combined_df = concat_chunks([composite_df, noncomposite_df])
+    elif len(composite_df) != 0:
+        combined_df = composite_df
+    elif len(noncomposite_df) != 0:
+        combined_df = noncomposite_df
+    else:
+        combined_df = pd.DataFrame()
+    
+    partitions = partition_by_field(combined_df, field_ids)
+    return {field_id: pd.DataFrame() if field_df is None else field_df for field_id, field_df in partitions.items()}
+
+def iter_soil_samples_for_fields(field_ids, chunksize=10000, variant=None):
+    """
+    Stream the soil samples of many fields as DataFrame chunks
+    
+    Composite samples come first, then non-composite ones, each read through a
+    server-side cursor and typed with SAMPLE_DTYPES, so a pipeline can classify
+    a farm chunk by chunk without loading it whole. Chunks have a field_id column
+    and may mix fields; empty chunks are skipped. Database errors are raised.
+    """
+    # Import the local database utilities
+    from utils.db import iter_pd_from_db_sql, terradot_db_session
+    
+    field_ids = field_id_list(field_ids)
+    if not field_ids:
+        return
+    
+    params = {'field_ids': field_ids}
+    with terradot_db_session() as connection:
+        for query_file in sample_query_files(variant):
+            for chunk in iter_pd_from_db_sql(read_query(query_file), connection, params=params,
+                                             chunksize=chunksize, dtype=SAMPLE_DTYPES):
+                if not chunk.empty:
+                    yield chunk
+
+def retrieve_soil_samples_from_db(field_id, variant=None):
+    """
+    Retrieve soil samples from database using agbenefits pipeline method
+    
+    Returns an empty DataFrame when the field has no samples; database errors
+    are raised. See retrieve_soil_samples_for_fields for loading many fields.
+    """
+    return retrieve_soil_samples_for_fields([field_id], variant)[int(field_id)]
+
+def boundaries_to_geodataframe(boundary_df):
+    """GeoDataFrame of boundary rows, decoding the WKB 'boundary' column (None when empty)"""
+    import geopandas as gpd
+    from shapely import wkb
+    
+    if boundary_df.empty:
+        return None
+    
+    # Convert WKB to geometry
+    geometries = []
+    for wkb_data in boundary_df['boundary']:
+        try:
+            if isinstance(wkb_data, str) and wkb_data.startswith('\\x'):
+                wkb_bytes = binascii.unhexlify(wkb_data[2:])
+            else:
+                wkb_bytes = binascii.unhexlify(wkb_data)
+            geometries.append(wkb.loads(wkb_bytes))
+        except:
+            geometries.append(None)
+    
+    # Create GeoDataFrame
+    gdf = gpd.GeoDataFrame(boundary_df, geometry=geometries, crs='EPSG:4326')
+    return gdf
+
+def retrieve_field_boundaries_for_fields(field_ids):
+    """
+    Retrieve the boundaries of many fields with one query using agbenefits pipeline method
+    
+    Returns {field_id: GeoDataFrame} for every requested field, None for fields
+    without boundaries; database errors are raised.
+    """
+    # Import the local database utilities
+    from utils.db import read_pd_from_db_sql, terradot_db_session
+    
+    field_ids = field_id_list(field_ids)
+    if not field_ids:
+        return {}
+    
+    # Read plot boundaries SQL query (same as agbenefits pipeline)
+    boundary_query = read_query(BOUNDARIES_QUERY)
+    
+    # Execute query using agbenefits pipeline method on a pooled connection
+    with terradot_db_session() as connection:
+        boundary_df = read_pd_from_db_sql(boundary_query, connection, params={'field_ids': field_ids})
+    
+    partitions = partition_by_field(boundary_df, field_ids)
+    return {field_id: None if field_df is None else boundaries_to_geodataframe(field_df)
+            for field_id, field_df in partitions.items()}
+
+def retrieve_field_boundaries_from_db(field_id):
+    """
+    Retrieve field boundaries from database using agbenefits pipeline method
+    
+    Returns None when the field has no boundaries; database errors are raised.
+    """
+    return retrieve_field_boundaries_for_fields([field_id])[int(field_id)]
+
+# Field data with where each field came from: 'snapshot' (local, still fresh or
+# unchanged in the database), 'database', 'offline snapshot' (stale, database
+# unreachable) or 'missing' (database unreachable and no snapshot)
+FieldLoad = namedtuple('FieldLoad', ['data', 'sources'])
+
+def snapshot_version(*query_files):
+    """Short hash of the SQL that produces a snapshot, so changed queries invalidate it"""
+    digest = hashlib.sha256()
+    for path in query_files:
+        digest.update(read_query(path).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+def retrieve_sample_versions(field_ids):
+    """{field_id: (latest sample_last_updated_at as text, sample row count)} for fields with samples"""
+    # Import the local database utilities
+    from utils.db import read_pd_from_db_sql, terradot_db_session
+    
+    with terradot_db_session() as connection:
+        versions_df = read_pd_from_db_sql(read_query(SAMPLE_VERSIONS_QUERY), connection,
+                                          params={'field_ids': field_id_list(field_ids)})
+    
+    versions = {}
+    for row in versions_df.itertuples():
+        last_updated = None if pd.isna(row.sample_last_updated_at) else str(pd.Timestamp(row.sample_last_updated_at))
+        versions[int(row.field_id)] = (last_updated, int(row.sample_rows))
+    return versions
+
+def load_soil_samples_for_fields(field_ids, variant=None, store=None):
+    """
+    Soil samples of many fields, served from local snapshots when possible
+    
+    Fresh snapshots are used as they are. For the rest, one query reads each
+    field's sample_last_updated_at and row count: unchanged fields keep their
+    snapshot, and only changed or new fields are read (in one bulk load) and
+    written back. If the database cannot be reached, stale snapshots are served
+    instead. Without a snapshot store (FIELD_SNAPSHOT_DIR unset) this is
+    retrieve_soil_samples_for_fields. Returns a FieldLoad of {field_id: DataFrame}.
+    """
+    from utils.snapshots import FIELD_SNAPSHOTS
+    
+    store = store or FIELD_SNAPSHOTS
+    field_ids = field_id_list(field_ids)
+    if not store.enabled:
+        return FieldLoad(retrieve_soil_samples_for_fields(field_ids, variant), dict.fromkeys(field_ids, 'database'))
+    
+    version = snapshot_version(*sample_query_files(variant))
+    snapshots = {field_id: store.get(field_id, 'samples', version) for field_id in field_ids}
+    data, sources = {}, {}
+    for field_id, snapshot in snapshots.items():
+        if snapshot is not None and store.is_fresh(snapshot):
+            data[field_id], sources[field_id] = snapshot_frame(snapshot), 'snapshot'
+    
+    stale = [field_id for field_id in field_ids if field_id not in data]
+    versions, fresh = {}, {}
+    try:
+        versions = retrieve_sample_versions(stale) if stale else {}
+        changed = []
+        for field_id in stale:
+            snapshot = snapshots[field_id]
+            current = versions.get(field_id, (None, 0))
+            stored = None if snapshot is None else (snapshot.meta.get('sample_last_updated_at'), snapshot.meta.get('sample_rows'))
+            if stored == current:
+                data[field_id], sources[field_id] = snapshot_frame(snapshot), 'snapshot'
+            else:
+                changed.append(field_id)
+        
+        if changed:
+            fresh = retrieve_soil_samples_for_fields(changed, variant)
+    except Exception as e:
+        serve_offline_snapshots(e, stale, snapshots, data, sources, pd.DataFrame)
+    
+    # Snapshots are only written once the database reads are done, so a local write
+    # error is never taken for an outage (store.put reports it and moves on)
+    for field_id in stale:
+        if sources.get(field_id) == 'snapshot':
+            store.touch(field_id, 'samples')
+    for field_id, field_df in fresh.items():
+        last_updated, rows = versions.get(field_id, (None, 0))
+        store.put(field_id, 'samples', None if field_df.empty else field_df, version,
+                  sample_last_updated_at=last_updated, sample_rows=rows)
+        data[field_id], sources[field_id] = field_df, 'database'
+    
+    return FieldLoad({field_id: data[field_id] for field_id in field_ids}, sources)
+
+def load_field_boundaries_for_fields(field_ids, store=None):
+    """
+    Boundaries of many fields, served from local snapshots when possible
+    
+    Boundaries carry no update time, so fields without a fresh snapshot are read
+    again (in one bulk load) and written back; if the database cannot be reached
+    their stale snapshots are served instead. Returns a FieldLoad of
+    {field_id: GeoDataFrame or None}.
+    """
+    from utils.snapshots import FIELD_SNAPSHOTS
+    
+    store = store or FIELD_SNAPSHOTS
+    field_ids = field_id_list(field_ids)
+    if not store.enabled:
+        return FieldLoad(retrieve_field_boundaries_for_fields(field_ids), dict.fromkeys(field_ids, 'database'))
+    
+    version = snapshot_version(BOUNDARIES_QUERY)
+    snapshots = {field_id: store.get(field_id, 'boundaries', version) for field_id in field_ids}
+    data, sources = {}, {}
+    for field_id, snapshot in snapshots.items():
+        if snapshot is not None and store.is_fresh(snapshot):
+            data[field_id], sources[field_id] = snapshot.data, 'snapshot'
+    
+    stale = [field_id for field_id in field_ids if field_id not in data]
+    fresh = {}
+    try:
+        if stale:
+            fresh = retrieve_field_boundaries_for_fields(stale)
+    except Exception as e:
+        serve_offline_snapshots(e, stale, snapshots, data, sources, lambda: None)
+    
+    # Written after the read, as for samples
+    for field_id, boundary_gdf in fresh.items():
+        store.put(field_id, 'boundaries', boundary_gdf, version)
+        data[field_id], sources[field_id] = boundary_gdf, 'database'
+    
+    return FieldLoad({field_id: data[field_id] for field_id in field_ids}, sources)
+
+def snapshot_frame(snapshot):
+    """Sample DataFrame of a snapshot (empty for a field stored without samples)"""
+    return pd.DataFrame() if snapshot.data is None else snapshot.data
+
+def serve_offline_snapshots(error, stale, snapshots, data, sources, empty):
+    """Fill the fields the database could not serve from stale snapshots; re-raise when none has one"""
+    missing = [field_id for field_id in stale if field_id not in data]
+    if missing and not any(snapshots[field_id] is not None for field_id in missing):
+        raise error
+    print(f"Database unavailable, serving local snapshots: {error}")
+    for field_id in missing:
+        snapshot = snapshots[field_id]
+        if snapshot is None:
+            data[field_id], sources[field_id] = empty(), 'missing'
+        else:
+            data[field_id] = empty() if snapshot.data is None else snapshot.data
+            sources[field_id] = 'offline snapshot'
+
+def translate_classification(classification, language='pt'):
+    """Translate classification levels"""
+    return TRANSLATIONS[language].get(classification, classification)
+
+def translate_parameter_for_display(param_name, language='pt'):
+    """Translate parameter name for display purposes based on current language"""
+    if language == 'pt':
+        # If language is Portuguese and parameter is in English, translate it
+        parameter_translations = get_parameter_translations()
+        if param_name.lower() in parameter_translations:
+            return parameter_translations[param_name.lower()]
+        return param_name
+    else:
+        # If language is English and parameter is in Portuguese, translate back to English
+        parameter_translations = get_parameter_translations()
+        # Create reverse mapping
+        reverse_translations = {v: k for k, v in parameter_translations.items()}
+        if param_name in reverse_translations:
+            return reverse_translations[param_name].title()  # Title case for display
+        return param_name
+
+def translate_column_for_display(col_name, language='pt'):
+    """Translate column name for display purposes based on current language"""
+    if language == 'pt':
+        # If language is Portuguese and column is in English, translate it
+        column_translations = get_column_translations()
+        if col_name in column_translations:
+            return column_translations[col_name]
+        return col_name
+    else:
+        # If language is English and column is in Portuguese, translate back to English
+        column_translations = get_column_translations()
+        # Create reverse mapping
+        reverse_translations = {v: k for k, v in column_translations.items()}
+        if col_name in reverse_translations:
+            return reverse_translations[col_name].replace('_', ' ').title()  # Title case for display
+        return col_name
+
+def get_grouping_columns_with_display_names(df, excluded_cols, language='pt'):
+    """Get available grouping columns with their display names"""
+    column_translations = get_column_translations()
+    reverse_translations = {v: k for k, v in column_translations.items()}
+    
+    # Get available columns for grouping
+    available_cols = [col for col in df.columns 
+                     if col not in excluded_cols 
+                     and df[col].dtype == 'object']
+    
+    # Create mapping of display names to actual column names
+    display_to_actual = {}
+    for col in available_cols:
+        display_name = translate_column_for_display(col, language)
+        display_to_actual[display_name] = col
+    
+    return display_to_actual
+
+# Configuration constants (keep original Portuguese classifications for data processing)
+PARAMS_MB_DEFAULT = {
+    # Matéria Orgânica
+    "Matéria orgânica (MO)": [(0, 0.7, "Muito Baixo"), (0.8, 1.5, "Baixo"), (1.6, 2.0, "Médio"), (2.1, 3.0, "Bom"), (3.1, float('inf'), "Muito Bom")],
+    "Carbono orgânico total": [(0, 8, "Muito Baixo"), (8, 15, "Baixo"), (15, 25, "Médio"), (25, 35, "Bom"), (35, float('inf'), "Muito Bom")],
+    
+    # Macronutrientes
+    "Cálcio trocável (Ca2+)": [(0, 0.4, "Muito Baixo"), (0.4, 1.20, "Baixo"), (1.21, 2.40, "Médio"), (2.41, 4.00, "Bom"), (4.01, float('inf'), "Muito Bom")],
+    "Magnésio trocável (Mg2+)": [(0, 0.15, "Muito Baixo"), (0.16, 0.45, "Baixo"), (0.46, 0.90, "Médio"), (0.91, 1.50, "Bom"), (1.51, float('inf'), "Muito Bom")],
+    "Potássio trocável (K+)": [(0, 25.0, "Muito Baixo"), (26.0, 50.0, "Baixo"), (51.0, 80.0, "Médio"), (81.0, 100.0, "Bom"), (100.1, float('inf'), "Muito Bom")],
+    
+    # Fósforo (Resina, Sequeiro)
+    "P - disponível": [(0, 5.0, "Muito Baixo"), (5.0, 8.0, "Baixo"), (8.0, 14.0, "Médio"), (14.0, 20.0, "Bom"), (20.0, float('inf'), "Muito Bom")],
+    "P disponível (Resina, Sequeiro)": [(0, 5.0, "Muito Baixo"), (5.0, 8.0, "Baixo"), (8.0, 14.0, "Médio"), (14.0, 20.0, "Bom"), (20.0, float('inf'), "Muito Bom")],
+    "P disponível (Resina, Irrigado)": [(0, 8.0, "Muito Baixo"), (8.0, 14.0, "Baixo"), (14.0, 20.0, "Médio"), (20.0, 35.0, "Bom"), (35.0, float('inf'), "Muito Bom")],
+}
+
+PARAMS_BA_DEFAULT = {
+    # pH
+    "pH em CaCl₂": [(0, 4.4, "Baixo"), (4.4, 4.8, "Médio"), (4.8, 5.5, "Bom"), (5.5, 5.8, "Alto"), (5.8, float('inf'), "Muito Alto")],
+    "pH em H₂O": [(0, 5.1, "Baixo"), (5.1, 5.5, "Médio"), (5.5, 6.3, "Bom"), (6.3, 6.6, "Alto"), (6.6, float('inf'), "Muito Alto")],
+    
+    # Saturações
+    "Saturação por bases (V%)": [(0, 20.0, "Baixo"), (20.0, 35.0, "Médio"), (35.0, 60.0, "Bom"), (60.0, 70.0, "Alto"), (70.0, float('inf'), "Muito Alto")],
+    "Saturação por alumínio (m%)": [(60.1, float('inf'), "Muito Alto"), (20.1, 60.0, "Alto"), (0, 20.0, "Muito Baixo")],  # Invertido - menor é melhor
+    
+    # CTC
+    "CTC efetiva (t)": [(0, 0.8, "Baixo"), (0.8, 2.30, "Médio"), (2.30, 4.60, "Bom"), (4.60, 8.00, "Alto"), (8.00, float('inf'), "Muito Alto")],
+    "CTC a pH 7,0 (T)": [(0, 1.6, "Baixo"), (1.6, 4.30, "Médio"), (4.30, 8.60, "Bom"), (8.60, 15.00, "Alto"), (15.00, float('inf'), "Muito Alto")],
+    
+    # Acidez (invertido - menor é melhor)
+    "Acidez trocável (Al3+)": [(2.01, float('inf'), "Muito Alto"), (1.01, 2.00, "Alto"), (0.51, 1.00, "Médio"), (0.21, 0.50, "Baixo"), (0, 0.20, "Muito Baixo")],
+    "Acidez potencial (H+Al)": [(9.01, float('inf'), "Muito Alto"), (5.01, 9.00, "Alto"), (2.51, 5.00, "Médio"), (1.01, 2.50, "Baixo"), (0, 1.0, "Muito Baixo")],
+    
+    # Micronutrientes
+    "Cobre (Cu)": [(0, 0.3, "Baixo"), (0.3, 0.7, "Médio"), (0.7, 1.2, "Bom"), (1.2, 1.8, "Alto"), (1.8, float('inf'), "Muito Alto")],
+    "Ferro (Fe)": [(0, 8.0, "Baixo"), (8.0, 18.0, "Médio"), (18.0, 30.0, "Bom"), (30.0, 45.0, "Alto"), (45.0, float('inf'), "Muito Alto")],
+    "Manganês (Mn)": [(0, 2.0, "Baixo"), (2.0, 5.0, "Médio"), (5.0, 8.0, "Bom"), (8.0, 12.0, "Alto"), (12.0, float('inf'), "Muito Alto")],
+    "Zinco (Zn)": [(0, 0.4, "Baixo"), (0.4, 0.9, "Médio"), (0.9, 1.5, "Bom"), (1.5, 2.2, "Alto"), (2.2, float('inf'), "Muito Alto")],
+    "Enxofre (S)": [(0, 2.0, "Baixo"), (2.0, 4.0, "Médio"), (4.0, 10.0, "Bom"), (10.0, 12.0, "Alto"), (12.0, float('inf'), "Muito Alto")],
+    "Boro (B)": [(0, 0.2, "Baixo"), (0.16, 0.35, "Médio"), (0.36, 0.60, "Bom"), (0.61, 0.90, "Alto"), (0.90, float('inf'), "Muito Alto")],
+}
+
+class SoilClassifier:
+    def __init__(self):
+        self.params_mb = PARAMS_MB_DEFAULT.copy()
+        self.params_ba = PARAMS_BA_DEFAULT.copy()
+        
+        # Compiled edge/label/center arrays per Portuguese parameter name, built once
+        # and shared by the scalar, dataframe, Excel, statistics and kriging paths
+        self.compiled_ranges = {}
+        for param_name in {**self.params_ba, **self.params_mb}:
+            self._compile_parameter(param_name)
+    
+    def add_custom_parameter(self, param_name, ranges, param_type="MB"):
+        """Add custom parameter classification ranges"""
+        if param_type == "MB":
+            self.params_mb[param_name] = ranges
+        else:
+            self.params_ba[param_name] = ranges
+        self._compile_parameter(param_name)
+    
+    def _compile_parameter(self, param_name):
+        """(Re)compile the ranges of one parameter - MB ranges take precedence over BA"""
+        if param_name in self.params_mb:
+            self.compiled_ranges[param_name] = CompiledRanges(self.params_mb[param_name])
+        else:
+            self.compiled_ranges[param_name] = CompiledRanges(self.params_ba[param_name])
+    
+    def get_compiled_ranges(self, param_name):
+        """Get the compiled ranges for an English or Portuguese parameter name, or None if it is not defined"""
+        if not isinstance(param_name, str):
+            return None
+        return self.compiled_ranges.get(resolve_parameter(param_name).name)
+    
+    def classify_value(self, param_name, value):
+        """Classify a single value - handles both English and Portuguese parameter names"""
+        try:
+            value = float(value)
+        except:
+            return "Valor inválido"
+        
+        compiled = self.get_compiled_ranges(param_name)
+        if compiled is None:
+            return "Classificação não definida"
+        
+        return compiled.labels[compiled.classify_one(value)]
+    
+    def classify_values(self, param_names, values):
+        """Classify parallel sequences of parameter names and values, one bin lookup per distinct parameter"""
+        values, valid = coerce_values(values)
+        classifications = np.full(len(values), "Valor inválido", dtype=object)
+        
+        # Group rows by parameter once; missing parameter names get code -1
+        param_codes, unique_params = pd.factorize(pd.Series(param_names))
+        for code in range(-1, len(unique_params)):
+            rows = (param_codes == code) & valid
+            if not rows.any():
+                continue
+            
+            compiled = self.get_compiled_ranges(unique_params[code]) if code >= 0 else None
+            if compiled is None:
+                classifications[rows] = "Classificação não definida"
+                continue
+            
+            labels = np.array(compiled.labels, dtype=object)
+            classifications[rows] = labels[compiled.classify(values[rows])]
+        
+        return classifications
+    
+    def classify_grid(self, param_name, grid):
+        """
+        Classify a float array (e.g. an interpolated kriging surface) for one parameter.
+        
+        Returns an integer category raster with the grid's shape and the labels its codes index into.
+        """
+        return classify_grid(self.get_compiled_ranges(param_name), grid)
+    
+    def classify_dataframe(self, df, param_col="Parâmetro", value_col="Resultado numérico"):
+        """Classify entire dataframe"""
+        if param_col not in df.columns or value_col not in df.columns:
+            raise ValueError(f"Colunas '{param_col}' ou '{value_col}' não encontradas no arquivo")
+        
+        df = df.copy()
+        df["Classificação"] = self.classify_values(df[param_col], df[value_col])
+        return df
+
+def create_classification_summary(df):
+    """Create summary statistics for classifications"""
+    if "Classificação" not in df.columns:
+        return {}
+    
+    summary = df["Classificação"].value_counts().to_dict()
+    total = len(df)
+    
+    return {
+        "total_samples": total,
+        "classification_counts": summary,
+        "classification_percentages": {k: (v/total)*100 for k, v in summary.items()}
+    }
+
+def create_kde_curve(data, x_range, bandwidth=None):
+    """Create KDE curve data"""
+    from scipy import stats
+    
+    if len(data) < 2:
+        return x_range, np.zeros_like(x_range)
+    
+    try:
+        kde = stats.gaussian_kde(data, bw_method=bandwidth)
+        density = kde(x_range)
+        return x_range, density
+    except:
+        # Fallback to simple histogram if KDE fails
+        hist, bin_edges = np.histogram(data, bins=50, density=True)
+        bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+        return bin_centers, hist
+
+def create_parameter_chart(df, param_name, group_by_cols=None, param_col="Parâmetro", value_col="Resultado numérico", separate_by_classification=False, language='pt'):
+    """Create KDE density curves for specific parameter with optional grouping"""
+    import plotly.graph_objects as go
+    
+    if param_col not in df.columns:
+        return None
+    
+    param_data = df[df[param_col] == param_name].copy()
+    if param_data.empty:
+        return None
+    
+    # Translate classifications for display
+    param_data["Classificação_Display"] = param_data["Classificação"].apply(translate_classification)
+    
+    # Translate parameter name for display
+    display_param_name = translate_parameter_for_display(param_name, language)
+    
+    # Get overall data range for x-axis
+    all_values = param_data[value_col].dropna()
+    if all_values.empty:
+        return None
+    
+    x_min, x_max = all_values.min(), all_values.max()
+    x_range = np.linspace(x_min, x_max, 200)
+    
+    # Handle subplot creation if separating by classification
+    if separate_by_classification:
+        classifications = param_data["Classificação_Display"].unique()
+        n_classifications = len(classifications)
+        
+        if n_classifications == 0:
+            return None
+        
+        # Create subplots
+        from plotly.subplots import make_subplots
+        fig = make_subplots(
+            rows=1, cols=n_classifications,
+            subplot_titles=classifications,
+            shared_yaxes=True,
+            horizontal_spacing=0.05
+        )
+    else:
+        # Create single figure
+        fig = go.Figure()
+    
+    # Handle multiple grouping columns
+    if group_by_cols:
+        # Filter to only include columns that exist in the data
+        valid_group_cols = [col for col in group_by_cols if col in param_data.columns]
+        
+        if valid_group_cols:
+            # Create a combined grouping column for multiple filters
+            if len(valid_group_cols) == 1:
+                combined_group_col = valid_group_cols[0]
+            else:
+                # Create a combined grouping column
+                param_data['Combined_Group'] = param_data[valid_group_cols].apply(
+                    lambda row: ' | '.join([f"{col}: {row[col]}" for col in valid_group_cols]), 
+                    axis=1
+                )
+                combined_group_col = 'Combined_Group'
+            
+            # Create plots for each classification
+            classifications = param_data["Classificação_Display"].unique()
+            
+            for i, classification in enumerate(classifications):
+                classification_data = param_data[param_data["Classificação_Display"] == classification]
+                groups = classification_data[combined_group_col].unique()
+                
+                for group in groups:
+                    group_data = classification_data[classification_data[combined_group_col] == group]
+                    values = group_data[value_col].dropna()
+                    
+                    if len(values) > 1:
+                        x_vals, density = create_kde_curve(values, x_range)
+                        
+                        if separate_by_classification:
+                            # Add to specific subplot
+                            fig.add_trace(go.Scatter(
+                                x=x_vals,
+                                y=density,
+                                mode='lines',
+                                fill='tozeroy',
+                                name=f"{group}",
+                                opacity=0.7,
+                                line=dict(width=2),
+                                showlegend=(i == 0)  # Only show legend for first subplot
+                            ), row=1, col=i+1)
+                        else:
+                            # Add to single plot
+                            fig.add_trace(go.Scatter(
+                                x=x_vals,
+                                y=density,
+                                mode='lines',
+                                fill='tozeroy',
+                                name=f"{classification} - {group}",
+                                opacity=0.7,
+                                line=dict(width=2)
+                            ))
+            
+            if separate_by_classification:
+                fig.update_layout(
+                title=f"{translate('distribution', language)} - {display_param_name} por {' + '.join(valid_group_cols)}",
+                    height=400
+                )
+                fig.update_xaxes(title_text="Valor")
+                fig.update_yaxes(title_text="Density")
+            else:
+                fig.update_layout(
+                    title=f"{translate('distribution', language)} - {display_param_name} por {' + '.join(valid_group_cols)}",
+                    xaxis_title="Valor",
+                    yaxis_title="Density",
+                    height=400
+                )
+        else:
+            # Fallback to classification-only grouping
+            classifications = param_data["Classificação_Display"].unique()
+            
+            for i, classification in enumerate(classifications):
+                classification_data = param_data[param_data["Classificação_Display"] == classification]
+                values = classification_data[value_col].dropna()
+                
+                if len(values) > 1:
+                    x_vals, density = create_kde_curve(values, x_range)
+                    
+                    if separate_by_classification:
+                        # Add to specific subplot
+                        fig.add_trace(go.Scatter(
+                            x=x_vals,
+                            y=density,
+                            mode='lines',
+                            fill='tozeroy',
+                            name=classification,
+                            opacity=0.7,
+                            line=dict(width=2),
+                            showlegend=False  # No legend needed for single classification per subplot
+                        ), row=1, col=i+1)
+                else:
+                        # Add to single plot
+                        fig.add_trace(go.Scatter(
+                            x=x_vals,
+                            y=density,
+                            mode='lines',
+                            fill='tozeroy',
+                            name=classification,
+                            opacity=0.7,
+                            line=dict(width=2)
+                        ))
+        
+        if separate_by_classification:
+            fig.update_layout(
+                title=f"{translate('distribution', language)} - {display_param_name}",
+                height=400
+            )
+            fig.update_xaxes(title_text="Valor")
+            fig.update_yaxes(title_text="Density")
+        else:
+            fig.update_layout(
+                title=f"{translate('distribution', language)} - {display_param_name}",
+                xaxis_title="Valor",
+                yaxis_title="Density",
+                height=400
+            )
+    else:
+        # No valid group columns, create default KDE plot by classification
+        classifications = param_data["Classificação_Display"].unique()
+        
+        for i, classification in enumerate(classifications):
+            classification_data = param_data[param_data["Classificação_Display"] == classification]
+            values = classification_data[value_col].dropna()
+            
+            if len(values) > 1:
+                    x_vals, density = create_kde_curve(values, x_range)
+                    
+                    if separate_by_classification:
+                        # Add to specific subplot
+                        fig.add_trace(go.Scatter(
+                            x=x_vals,
+                            y=density,
+                            mode='lines',
+                            fill='tozeroy',
+                            name=classification,
+                            opacity=0.7,
+                            line=dict(width=2),
+                            showlegend=False  # No legend needed for single classification per subplot
+                        ), row=1, col=i+1)
+                    else:
+                        # Add to single plot
+                        fig.add_trace(go.Scatter(
+                                x=x_vals,
+                                y=density,
+                                mode='lines',
+                                fill='tozeroy',
+                                name=classification,
+                                opacity=0.7,
+                                line=dict(width=2)
+                            ))
+        
+        if separate_by_classification:
+            fig.update_layout(
+                title=f"{translate('distribution', language)} - {display_param_name}",
+                height=400
+            )
+            fig.update_xaxes(title_text="Valor")
+            fig.update_yaxes(title_text="Density")
+        else:
+            fig.update_layout(
+                title=f"{translate('distribution', language)} - {display_param_name}",
+                xaxis_title="Valor",
+                yaxis_title="Density",
+                height=400
+            )
+    
+    return fig
+
+def create_spatial_plot(gdf, param_name, polygon_gdf=None, purpose_filter=None, depth_filter=None, 
+                       param_col="Parâmetro", value_col="Resultado numérico", 
+                       purpose_col="sampling_plan_purpose", depth_col="depth_range_bottom_m",
+                       cmap="viridis", point_size=100, language='pt'):
+    """Create spatial plot for a specific parameter with optional filters"""
+    import matplotlib.pyplot as plt
+    from utils.spatial import to_crs_cached
+    
+    if param_col not in gdf.columns or value_col not in gdf.columns:
+        return None
+    
+    # Filter data for the parameter
+    param_data = gdf[gdf[param_col] == param_name].copy()
+    if param_data.empty:
+        return None
+    
+    # Apply filters
+    if purpose_filter and purpose_filter != "All" and purpose_col in param_data.columns:
+        param_data = param_data[param_data[purpose_col] == purpose_filter]
+    
+    if depth_filter and depth_filter != "All" and depth_col in param_data.columns:
+        param_data = param_data[param_data[depth_col] == depth_filter]
+    
+    if param_data.empty:
+        return None
+    
+    # Convert numeric values
+    param_data[value_col] = pd.to_numeric(param_data[value_col], errors='coerce')
+    param_data = param_data.dropna(subset=[value_col])
+    
+    if param_data.empty:
+        return None
+    
+    # Create figure
+    fig, ax = plt.subplots(1, 1, figsize=(12, 8))
+    
+    # Get value range for consistent coloring
+    vmin = param_data[value_col].min()
+    vmax = param_data[value_col].max()
+    
+    # Handle case where all values are the same
+    if vmin == vmax:
+        vmin -= 0.01
+        vmax += 0.01
+    
+    # Plot polygon boundaries if available
+    if polygon_gdf is not None and not polygon_gdf.empty:
+        # Ensure same CRS
+        polygon_gdf = to_crs_cached(polygon_gdf, param_data.crs)
+        
+        # Plot boundaries
+        polygon_gdf.boundary.plot(ax=ax, color="black", linewidth=2)
+        
+        # Add plot type labels if available
+        if "plot_type" in polygon_gdf.columns:
+            for _, row in polygon_gdf.iterrows():
+                if row.geometry is not None and not row.geometry.is_empty:
+                    centroid = row.geometry.centroid
+                    label = str(row["plot_type"])[0].upper()
+                    ax.text(
+                        centroid.x, centroid.y, label,
+                        ha="center", va="center",
+                        fontsize=14, fontweight="bold", color="black",
+                        bbox=dict(facecolor="white", alpha=0.7, boxstyle="circle,pad=0.3")
+                    )
+    
+    # Plot points
+    scatter = param_data.plot(
+        ax=ax,
+        column=value_col,
+        cmap=cmap,
+        markersize=point_size,
+        alpha=0.8,
+        vmin=vmin,
+        vmax=vmax,
+        legend=False,
+        edgecolor="k",
+        linewidth=0.5
+    )
+    
+    # Set equal aspect ratio and labels
+    ax.set_aspect("equal", adjustable="box")
+    ax.set_xlabel("Longitude", fontsize=12)
+    ax.set_ylabel("Latitude", fontsize=12)
+    
+    # Title
+    display_param_name = translate_parameter_for_display(param_name, language)
+    title_parts = [display_param_name]
+    
+    if purpose_filter and purpose_filter != "All":
+        title_parts.append(f"Purpose: {purpose_filter}")
+    
+    if depth_filter and depth_filter != "All":
+        title_parts.append(f"Depth: {depth_filter}")
+    
+    title = " - ".join(title_parts)
+    ax.set_title(title, fontsize=14, fontweight="bold")
+    
+    # Add colorbar
+    sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=vmin, vmax=vmax))
+    sm._A = []
+    cbar = plt.colorbar(sm, ax=ax, shrink=0.8)
+    cbar.set_label(value_col, fontsize=12)
+    
+    plt.tight_layout()
+    return fig
+
+def create_spatial_comparison_plot(gdf, param_name, polygon_gdf=None, purposes=("PRE_APPLICATION", "CREDIT_SAMPLING_1"),
+                                 param_col="Parâmetro", value_col="Resultado numérico", 
+                                 purpose_col="sampling_plan_purpose", depth_col="depth_range_bottom_m",
+                                 cmap="viridis", point_size=100, language='pt'):
+    """Create spatial comparison plot with two panels for different purposes"""
+    import matplotlib.pyplot as plt
+    from utils.spatial import to_crs_cached
+    
+    if param_col not in gdf.columns or value_col not in gdf.columns:
+        return None
+    
+    # Filter data for the parameter
+    param_data = gdf[gdf[param_col] == param_name].copy()
+    if param_data.empty:
+        return None
+    
+    # Convert numeric values
+    param_data[value_col] = pd.to_numeric(param_data[value_col], errors='coerce')
+    param_data = param_data.dropna(subset=[value_col])
+    
+    if param_data.empty:
+        return None
+    
+    # Get global value range for consistent coloring across panels
+    vmin = param_data[value_col].min()
+    vmax = param_data[value_col].max()
+    
+    if vmin == vmax:
+        vmin -= 0.01
+        vmax += 0.01
+    
+    # Create figure with two subplots
+    fig, axes = plt.subplots(1, 2, figsize=(16, 8))
+    
+    for i, purpose in enumerate(purposes):
+        ax = axes[i]
+        
+        # Filter data for this purpose
+        purpose_data = param_data[param_data[purpose_col] == purpose] if purpose_col in param_data.columns else param_data
+        
+        # Plot polygon boundaries if available
+        if polygon_gdf is not None and not polygon_gdf.empty:
+            # Ensure same CRS
+            polygon_gdf = to_crs_cached(polygon_gdf, param_data.crs)
+            
+            # Plot boundaries
+            polygon_gdf.boundary.plot(ax=ax, color="black", linewidth=2)
+            
+            # Add plot type labels if available
+            if "plot_type" in polygon_gdf.columns:
+                for _, row in polygon_gdf.iterrows():
+                    if row.geometry is not None and not row.geometry.is_empty:
+                        centroid = row.geometry.centroid
+                        label = str(row["plot_type"])[0].upper()
+                        ax.text(
+                            centroid.x, centroid.y, label,
+                            ha="center", va="center",
+                            fontsize=12, fontweight="bold", color="black",
+                            bbox=dict(facecolor="white", alpha=0.7, boxstyle="circle,pad=0.2")
+                        )
+        
+        # Plot points for this purpose
+        if not purpose_data.empty:
+            purpose_data.plot(
+                ax=ax,
+                column=value_col,
+                cmap=cmap,
+                markersize=point_size,
+                alpha=0.8,
+                vmin=vmin,
+                vmax=vmax,
+                legend=False,
+                edgecolor="k",
+                linewidth=0.5
+            )
+            ax.set_title(purpose, fontsize=14, fontweight="bold")
+        else:
+            ax.set_title(f"{purpose} (No Data)", fontsize=14, fontweight="bold")
+        
+        # Set equal aspect ratio and labels
+        ax.set_aspect("equal", adjustable="box")
+        ax.set_xlabel("Longitude", fontsize=10)
+        ax.set_ylabel("Latitude", fontsize=10)
+    
+    # Synchronize axis limits
+    if polygon_gdf is not None and not polygon_gdf.empty:
+        # Use polygon bounds
+        polygon_gdf = to_crs_cached(polygon_gdf, param_data.crs)
+        xmin, ymin, xmax, ymax = polygon_gdf.total_bounds
+        pad_x = (xmax - xmin) * 0.02
+        pad_y = (ymax - ymin) * 0.02
+        xmin, xmax = xmin - pad_x, xmax + pad_x
+        ymin, ymax = ymin - pad_y, ymax + pad_y
+    else:
+        # Use data bounds
+        xmin, ymin, xmax, ymax = param_data.total_bounds
+        pad_x = (xmax - xmin) * 0.02
+        pad_y = (ymax - ymin) * 0.02
+        xmin, xmax = xmin - pad_x, xmax + pad_x
+        ymin, ymax = ymin - pad_y, ymax + pad_y
+    
+    for ax in axes:
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+    
+    # Main title
+    display_param_name = translate_parameter_for_display(param_name, language)
+    fig.suptitle(f"Spatial Comparison - {display_param_name}", fontsize=16, fontweight="bold")
+    
+    # Add colorbar
+    plt.subplots_adjust(right=0.85, top=0.9)
+    sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=vmin, vmax=vmax))
+    sm._A = []
+    cbar_ax = fig.add_axes([0.88, 0.15, 0.02, 0.7])
+    cbar = fig.colorbar(sm, cax=cbar_ax)
+    cbar.set_label(value_col, fontsize=12)
+    
+    plt.tight_layout()
+    return fig
+
+def create_box_plot(df, param_name, group_by_cols, param_col="Parâmetro", value_col="Resultado numérico", language='pt'):
+    """Create box plot for parameter grouped by specified columns"""
+    import plotly.express as px
+    
+    if param_col not in df.columns or value_col not in df.columns:
+        return None
+    
+    param_data = df[df[param_col] == param_name].copy()
+    if param_data.empty:
+        return None
+    
+    # Translate parameter name for display
+    display_param_name = translate_parameter_for_display(param_name, language)
+    
+    # Handle multiple grouping columns
+    if group_by_cols:
+        # Filter to only include columns that exist in the data
+        valid_group_cols = [col for col in group_by_cols if col in param_data.columns]
+        
+        if valid_group_cols:
+            # Create a combined grouping column for multiple filters
+            if len(valid_group_cols) == 1:
+                combined_group_col = valid_group_cols[0]
+            else:
+                # Create a combined grouping column
+                param_data['Combined_Group'] = param_data[valid_group_cols].apply(
+                    lambda row: ' | '.join([f"{col}: {row[col]}" for col in valid_group_cols]), 
+                    axis=1
+                )
+                combined_group_col = 'Combined_Group'
+            
+            fig = px.box(
+                param_data,
+                x=combined_group_col,
+                y=value_col,
+                color=combined_group_col,
+                title=f"{translate('distribution', language)} de {display_param_name} por {' + '.join(valid_group_cols)}",
+                labels={value_col: "Valor"}
+            )
+        else:
+            return None
+    else:
+        return None
+    
+    fig.update_layout(height=400)
+    return fig
+
+def create_statistical_summary(df, group_cols, param_col="Parâmetro", value_col="Resultado numérico", language='pt'):
+    """Create statistical summary grouped by specified columns"""
+    if not all(col in df.columns for col in group_cols + [param_col, value_col]):
+        return None
+    
+    # Calculate statistics
+    stats = df.groupby(group_cols + [param_col])[value_col].agg([
+        'count', 'mean', 'std', 'min', 'max', 'median'
+    ]).round(3)
+    
+    lang = language
+    if lang == 'en':
+        stats.columns = ['N_Samples', 'Mean', 'Std_Deviation', 'Minimum', 'Maximum', 'Median']
+    else:
+        stats.columns = ['N_Amostras', 'Média', 'Desvio_Padrão', 'Mínimo', 'Máximo', 'Mediana']
+    
+    stats = stats.reset_index()
+    return stats
+
+def create_comparison_chart(df, param_name, group_col, stat_type="mean", param_col="Parâmetro", value_col="Resultado numérico", language='pt'):
+    """Create comparison chart showing statistics by group"""
+    import plotly.express as px
+    
+    if param_col not in df.columns or group_col not in df.columns:
+        return None
+    
+    param_data = df[df[param_col] == param_name].copy()
+    if param_data.empty:
+        return None
+    
+    # Calculate statistics by group
+    if stat_type == "mean":
+        stats = param_data.groupby(group_col)[value_col].mean()
+        title_stat = STAT_NAMES[language]['mean']
+    elif stat_type == "std":
+        stats = param_data.groupby(group_col)[value_col].std()
+        title_stat = STAT_NAMES[language]['std']
+    else:
+        stats = param_data.groupby(group_col)[value_col].median()
+        title_stat = STAT_NAMES[language]['median']
+    
+    # Translate parameter name for display
+    display_param_name = translate_parameter_for_display(param_name, language)
+    
+    fig = px.bar(
+        x=stats.index,
+        y=stats.values,
+        title=f"{title_stat} de {display_param_name} por {group_col}",
+        labels={"x": group_col, "y": f"{title_stat}"}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+def create_overview_chart(df, language='pt'):
+    """Create overview classification chart"""
+    import plotly.graph_objects as go
+    
+    if "Classificação" not in df.columns:
+        return None
+    
+    # Translate classifications for display
+    df_display = df.copy()
+    df_display["Classificação_Display"] = df_display["Classificação"].apply(translate_classification)
+    
+    summary = df_display["Classificação_Display"].value_counts()
+    
+    # Define colors for classifications
+    color_map = {
+        translate_classification("Muito Baixo", language): "#FF4C4C",
+        translate_classification("Baixo", language): "#FFA04C", 
+        translate_classification("Médio", language): "#FFE14C",
+        translate_classification("Bom", language): "#9BEA8C",
+        translate_classification("Muito Bom", language): "#4CD964",
+        translate_classification("Alto", language): "#4CD964",
+        translate_classification("Muito Alto", language): "#1F7A1F"
+    }
+    
+    colors = [color_map.get(cat, "#CCCCCC") for cat in summary.index]
+    
+    fig = go.Figure(data=[
+        go.Bar(x=summary.index, y=summary.values, marker_color=colors)
+    ])
+    
+    fig.update_layout(
+        title=translate('classification_summary', language),
+        xaxis_title=translate('classification_breakdown', language).replace('📋 ', ''),
+        yaxis_title=translate('samples', language),
+        height=400
+    )
+    
+    return fig
+
+def build_parameter_kriging_jobs(df, points_gdf, polygon_gdf, classifier, param_col, value_col,
+                                 purpose_filter=None, depth_filter=None, grid_res=None, language='pt'):
+    """One kriging map job per parameter in the data, skipping (and reporting) parameters without a map"""
+    if points_gdf is None or polygon_gdf is None:
+        return []
+    
+    # Get unique parameters from the data
+    unique_params = df[param_col].unique() if param_col in df.columns else []
+    
+    jobs = []
+    for param in unique_params:
+        job, error = build_kriging_map_job(points_gdf, polygon_gdf, param, classifier, param_col, value_col,
+                                           purpose_filter, depth_filter, grid_res, language)
+        if job is None:
+            print(f"Error generating kriging map for {param}: {error}")
+            continue
+        jobs.append(job)
+    
+    return jobs
+
+def generate_all_parameter_kriging_maps(df, points_gdf, polygon_gdf, classifier, param_col, value_col, 
+                                      purpose_filter=None, depth_filter=None, grid_res=None,
+                                      max_workers=None, on_map_ready=None, language='pt'):
+    """
+    Generate kriging maps for all parameters and return them as PNG bytes
+    
+    Each map is a dict with 'parameter', 'title', 'image' (PNG bytes) and its pixel
+    'width' and 'height'. Maps already rendered (e.g. in the app) come from the image
+    cache; the rest are computed in a process pool (max_workers, default
+    KRIGING_MAX_WORKERS or the CPU count; 1 runs in-process). on_map_ready is called
+    with each map as it finishes, while the returned list keeps the parameter order.
+    Without grid_res each map's resolution is chosen from the field extent and its
+    sample spacing.
+    """
+    from utils.kriging import run_kriging_jobs
+    
+    jobs = build_parameter_kriging_jobs(df, points_gdf, polygon_gdf, classifier, param_col, value_col,
+                                        purpose_filter, depth_filter, grid_res, language)
+    return run_kriging_jobs(jobs, max_workers=max_workers, on_result=on_map_ready)
+
+class StreamingStory(list):
+    """
+    Story for ReportLab's doc.build that pulls sections from an iterator lazily
+    
+    ReportLab checks len(story) before laying out each flowable, so the next
+    section (e.g. a parameter's map page) is only generated once the previous one
+    has been laid out and dropped from the list. Only one section's images are
+    alive at a time, whatever the number of sections.
+    """
+    
+    def __init__(self, flowables, sections):
+        super().__init__(flowables)
+        self._sections = iter(sections)
+    
+    def __len__(self):
+        # Keep two flowables buffered so keepWithNext look-ahead still works
+        while list.__len__(self) < 2 and self._sections is not None:
+            section = next(self._sections, None)
+            if section is None:
+                self._sections = None
+            else:
+                self.extend(section)
+        return list.__len__(self)
+
+def generate_pdf_report(df, summary_stats, charts_data, project_name="Soil Analysis", 
+                       points_gdf=None, polygon_gdf=None, classifier=None, 
+                       param_col=None, value_col=None, purpose_filter=None, depth_filter=None,
+                       progress_callback=None, max_workers=None, language='pt'):
+    """
+    Generate PDF report with kriging maps
+    
+    Map pages are generated and laid out one parameter at a time, so memory does not
+    grow with the number of parameters. progress_callback(done, total) is called as
+    each map page is laid out.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    
+    
+    # Build the PDF in memory
+    pdf_buffer = io.BytesIO()
+    
+    # Create PDF document
+    doc = SimpleDocTemplate(
+        pdf_buffer,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        alignment=TA_CENTER,
+        spaceAfter=30
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        alignment=TA_LEFT,
+        spaceAfter=12
+    )
+    
+    subheading_style = ParagraphStyle(
+        'CustomSubHeading',
+        parent=styles['Heading3'],
+        fontSize=12,
+        alignment=TA_LEFT,
+        spaceAfter=8
+    )
+    
+    # Build story
+    story = []
+    
+    # Title
+    story.append(Paragraph(translate('page_title', language), title_style))
+    story.append(Paragraph(f"Project: {project_name}", styles['Normal']))
+    story.append(Paragraph(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Summary section
+    story.append(Paragraph("Executive Summary", heading_style))
+    
+    summary_data = [
+        ["Metric", "Value"],
+        ["Total Samples", f"{summary_stats['total_samples']:,}"],
+        ["Parameters Analyzed", f"{df['Parâmetro'].nunique() if 'Parâmetro' in df.columns else 'N/A'}"],
+    ]
+    
+    # Add classification breakdown
+    if 'classification_counts' in summary_stats:
+        for classification, count in summary_stats['classification_counts'].items():
+            percentage = summary_stats['classification_percentages'][classification]
+            translated_class = translate_classification(classification, language)
+            summary_data.append([f"{translated_class}", f"{count} ({percentage:.1f}%)"])
+    
+    summary_table = Table(summary_data)
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+    
+    # Add Kriging Maps section if geospatial data is available
+    if points_gdf is not None and polygon_gdf is not None and classifier is not None:
+        story.append(PageBreak())
+        story.append(Paragraph("Kriging Maps", heading_style))
+        story.append(Paragraph("Spatial interpolation maps showing the distribution of soil parameters across the field.", styles['Normal']))
+        story.append(Spacer(1, 12))
+        
+        # Kriging map pages are generated lazily while the document is laid out
+        jobs = build_parameter_kriging_jobs(df, points_gdf, polygon_gdf, classifier, param_col, value_col,
+                                            purpose_filter, depth_filter, language=language)
+        story = StreamingStory(story, pdf_kriging_map_sections(jobs, subheading_style, progress_callback,
+                                                               max_workers))
+    
+    # Build PDF
+    doc.build(story)
+    
+    return pdf_buffer.getvalue()
+
+def pdf_kriging_map_sections(jobs, subheading_style, progress_callback=None, max_workers=None):
+    """Yield the PDF flowables of one kriging map page at a time"""
+    from reportlab.platypus import Paragraph, Spacer, PageBreak, Image
+    from reportlab.lib.units import inch
+    from utils.kriging import iter_kriging_jobs
+    
+    total = len(jobs)
+    for done, kriging_data in enumerate(iter_kriging_jobs(jobs, max_workers=max_workers)):
+        # Everything before this map has been laid out by now
+        if progress_callback is not None:
+            progress_callback(done, total)
+        
+        try:
+            # Add page break before each map after the first for better readability
+            section = [PageBreak()] if done > 0 else []
+            
+            # Add parameter title
+            section.append(Paragraph(kriging_data['title'], subheading_style))
+            
+            # Add the image with dynamic sizing based on actual aspect ratio
+            aspect_ratio = kriging_data['width'] / kriging_data['height']
+            
+            # Set maximum dimensions and maintain aspect ratio
+            max_width = 7*inch
+            max_height = 6*inch
+            
+            if aspect_ratio > 1:  # Landscape
+                width = min(max_width, max_height * aspect_ratio)
+                height = width / aspect_ratio
+            else:  # Portrait
+                height = min(max_height, max_width / aspect_ratio)
+                width = height * aspect_ratio
+            
+            section.append(Image(io.BytesIO(kriging_data['image']), width=width, height=height))
+            section.append(Spacer(1, 12))
+            
+            yield section
+                
+        except Exception as e:
+            print(f"Error adding kriging map to PDF: {str(e)}")
+            continue
+    
+    if progress_callback is not None:
+        progress_callback(total, total)
+
+def generate_docx_report(df, summary_stats, charts_data, project_name="Soil Analysis", 
+                        points_gdf=None, polygon_gdf=None, classifier=None, 
+                        param_col=None, value_col=None, purpose_filter=None, depth_filter=None,
+                        progress_callback=None, max_workers=None, language='pt'):
+    """
+    Generate DOCX report with kriging maps
+    
+    Maps are generated and added one parameter at a time; progress_callback(done, total)
+    is called as each one is added.
+    """
+    from docx import Document
+    from docx.shared import Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from utils.kriging import iter_kriging_jobs
+    
+    
+    # Create new Document
+    doc = Document()
+    
+    # Set document margins
+    sections = doc.sections
+    for section in sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1)
+        section.right_margin = Inches(1)
+    
+    # Title
+    title = doc.add_heading(translate('page_title', language), 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    # Project info
+    doc.add_paragraph(f"Project: {project_name}")
+    doc.add_paragraph(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    doc.add_paragraph()  # Empty line
+    
+    # Executive Summary section
+    doc.add_heading('Executive Summary', level=1)
+    
+    # Summary table
+    summary_table = doc.add_table(rows=1, cols=2)
+    summary_table.style = 'Table Grid'
+    summary_table.alignment = WD_TABLE_ALIGNMENT.CENTER
+    
+    # Header row
+    hdr_cells = summary_table.rows[0].cells
+    hdr_cells[0].text = 'Metric'
+    hdr_cells[1].text = 'Value'
+    
+    # Add summary data
+    summary_data = [
+        ["Total Samples", f"{summary_stats['total_samples']:,}"],
+        ["Parameters Analyzed", f"{df['Parâmetro'].nunique() if 'Parâmetro' in df.columns else 'N/A'}"],
+    ]
+    
+    # Add classification breakdown
+    if 'classification_counts' in summary_stats:
+        for classification, count in summary_stats['classification_counts'].items():
+            percentage = summary_stats['classification_percentages'][classification]
+            translated_class = translate_classification(classification, language)
+            summary_data.append([f"{translated_class}", f"{count} ({percentage:.1f}%)"])
+    
+    # Add data rows
+    for metric, value in summary_data:
+        row_cells = summary_table.add_row().cells
+        row_cells[0].text = metric
+        row_cells[1].text = value
+    
+    doc.add_paragraph()  # Empty line
+    
+    # Add Kriging Maps section if geospatial data is available
+    if points_gdf is not None and polygon_gdf is not None and classifier is not None:
+        doc.add_heading('Kriging Maps', level=1)
+        doc.add_paragraph('Spatial interpolation maps showing the distribution of soil parameters across the field.')
+        doc.add_paragraph()  # Empty line
+        
+        # Generate kriging maps for all parameters, one at a time
+        jobs = build_parameter_kriging_jobs(df, points_gdf, polygon_gdf, classifier, param_col, value_col,
+                                            purpose_filter, depth_filter, language=language)
+        
+        # Add each kriging map to the DOCX
+        for i, kriging_data in enumerate(iter_kriging_jobs(jobs, max_workers=max_workers)):
+            if progress_callback is not None:
+                progress_callback(i, len(jobs))
+            
+            try:
+                # Add page break before each map after the first for better readability
+                if i > 0:
+                    doc.add_page_break()
+                
+                # Add parameter title
+                doc.add_heading(kriging_data['title'], level=2)
+                
+                # Add the image with appropriate sizing
+                aspect_ratio = kriging_data['width'] / kriging_data['height']
+                
+                # Set maximum dimensions and maintain aspect ratio
+                max_width = 6.5  # inches
+                max_height = 5.0  # inches
+                
+                if aspect_ratio > 1:  # Landscape
+                    width = min(max_width, max_height * aspect_ratio)
+                    height = width / aspect_ratio
+                else:  # Portrait
+                    height = min(max_height, max_width / aspect_ratio)
+                    width = height * aspect_ratio
+                
+                # Add image to document
+                doc.add_picture(io.BytesIO(kriging_data['image']), width=Inches(width))
+                    
+            except Exception as e:
+                print(f"Error adding kriging map to DOCX: {str(e)}")
+                continue
+        
+        if progress_callback is not None:
+            progress_callback(len(jobs), len(jobs))
+    
+    # Save to BytesIO buffer
+    doc_buffer = io.BytesIO()
+    doc.save(doc_buffer)
+    doc_buffer.seek(0)
+    
+    return doc_buffer.getvalue()
+
+def generate_excel_report(classified_df, param_col, value_col, language='pt', classifier=None):
+    """Generate the colored Excel export (classified data, averages, statistics and legend) as bytes"""
+    output = io.BytesIO()
+    
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Prepare export dataframe
+        export_df = classified_df.copy()
+        export_df["Classificação"] = export_df["Classificação"].apply(lambda c: TRANSLATIONS[language].get(c, c))
+        
+        # Translate to English if language is English
+        if language == 'en':
+            export_df = translate_column_names_to_english(export_df)
+            main_sheet_name = 'Classified_Data'
+            classification_col_name = 'Classification'
+        else:
+            main_sheet_name = 'Dados_Classificados'
+            classification_col_name = 'Classificação'
+        
+        export_df.to_excel(writer, sheet_name=main_sheet_name, index=False)
+        
+        # Apply colors to the classification column
+        apply_excel_colors(writer.book[main_sheet_name], classification_col_name)
+        
+        # Médias (Averages) sheet by plot_type
+        create_medias_sheet(writer, classified_df, param_col, value_col, language=language, classifier=classifier)
+        
+        # Statistics per plot_type, sampling_plan_purpose, depth_range_bottom_m with classified means
+        stats_df = create_comprehensive_statistics_with_classification(
+            classified_df, 
+            ['Tratamento', 'Data amostragem', 'profundidade inferior'], 
+            param_col, 
+            value_col,
+            language=language,
+            classifier=classifier
+        )
+        
+        if stats_df is not None and not stats_df.empty:
+            if language == 'en':
+                stats_sheet_name = 'Detailed_Statistics'
+                stats_classification_col = 'Mean_Classification'
+            else:
+                stats_sheet_name = 'Estatísticas_Detalhadas'
+                stats_classification_col = 'Classificação_Média'
+            
+            stats_df.to_excel(writer, sheet_name=stats_sheet_name, index=False)
+            # Apply colors to the classification column in statistics
+            apply_excel_colors(writer.book[stats_sheet_name], stats_classification_col)
+        
+        # Create color legend sheet
+        create_color_legend_sheet(writer.book, language=language)
+    
+    return output.getvalue()
+
+def detect_geometry_columns(df):
+    """Detect potential geometry columns in the dataframe"""
+    geometry_columns = []
+    
+    for col in df.columns:
+        col_lower = col.lower()
+        # Check for common geometry column names
+        if any(keyword in col_lower for keyword in ['geometry', 'geom', 'shape', 'wkb', 'wkt', 'coordinates', 'coord']):
+            geometry_columns.append(col)
+        else:
+            # Check if column contains WKB or WKT data
+            sample_values = df[col].dropna().head(10)
+            if len(sample_values) > 0:
+                # Check if values look like WKB (hex strings or binary)
+                sample_str = str(sample_values.iloc[0])
+                if (len(sample_str) > 20 and 
+                    (all(c in '0123456789ABCDEFabcdef' for c in sample_str.replace(' ', '')) or
+                     isinstance(sample_values.iloc[0], bytes))):
+                    geometry_columns.append(col)
+                # Check if values look like WKT
+                elif any(wkt_keyword in sample_str.upper() for wkt_keyword in ['POINT', 'POLYGON', 'LINESTRING', 'MULTIPOINT', 'MULTIPOLYGON']):
+                    geometry_columns.append(col)
+    
+    return geometry_columns
+
+def convert_wkb_to_geometry(wkb_data):
+    """Convert WKB data to Shapely geometry objects"""
+    from shapely import wkb, wkt
+    
+    try:
+        if isinstance(wkb_data, str):
+            # Try as hex string first
+            try:
+                return wkb.loads(wkb_data, hex=True)
+            except:
+                # Try as regular WKB
+                try:
+                    return wkb.loads(bytes.fromhex(wkb_data))
+                except:
+                    # Try as WKT
+                    return wkt.loads(wkb_data)
+        elif isinstance(wkb_data, bytes):
+            return wkb.loads(wkb_data)
+        else:
+            # Try to convert to string and parse as WKT
+            return wkt.loads(str(wkb_data))
+    except Exception as e:
+        print(f"Error converting WKB data: {e}")
+        return None
+
+def create_geodataframe_from_geometry(df, geometry_col, crs='EPSG:4326'):
+    """Create a GeoDataFrame from a dataframe with geometry column"""
+    import geopandas as gpd
+    
+    try:
+        # Create a copy of the dataframe
+        gdf_data = df.copy()
+        
+        # Convert geometry column to Shapely geometries
+        geometries = []
+        for idx, geom_data in enumerate(gdf_data[geometry_col]):
+            if pd.isna(geom_data):
+                geometries.append(None)
+            else:
+                geom = convert_wkb_to_geometry(geom_data)
+                if geom is not None:
+                    geometries.append(geom)
+                else:
+                    geometries.append(None)
+        
+        # Replace the geometry column with converted geometries
+        gdf_data[geometry_col] = geometries
+        
+        # Remove rows with invalid geometries
+        gdf_data = gdf_data.dropna(subset=[geometry_col])
+        
+        # Create GeoDataFrame
+        gdf = gpd.GeoDataFrame(gdf_data, geometry=geometry_col, crs=crs)
+        
+        return gdf
+        
+    except Exception as e:
+        print(f"Error creating GeoDataFrame: {e}")
+        return None
+
+def prepare_database_samples(soil_samples_df, param_col, result_col, geom_col, crs='EPSG:4326'):
+    """Rename database sample columns to Parameter/Result/geometry and build their GeoDataFrame"""
+    processed_df = soil_samples_df.rename(columns={
+        param_col: 'Parameter',
+        result_col: 'Result',
+        geom_col: 'geometry'
+    })
+    return create_geodataframe_from_geometry(processed_df, 'geometry', crs)
+
+# English lab names (lower case) -> Portuguese parameter names used by the classification tables
+PARAMETER_TRANSLATIONS = {
+    "aluminum saturation": "Saturação por alumínio (m%)",
+    "aluminum soil": "Acidez trocável (Al3+)",
+    "base saturation": "Saturação por bases (V%)",
+    "calcium soil": "Cálcio trocável (Ca2+)",
+    "copper soil": "Cobre (Cu)",
+    "effective cation exchange capacity": "CTC efetiva (t)",
+    "iron soil": "Ferro (Fe)",
+    "magnesium soil": "Magnésio trocável (Mg2+)",
+    "manganese soil": "Manganês (Mn)",
+    "organic matter": "Matéria orgânica (MO)",
+    "ph in cacl2": "pH em CaCl₂",
+    "ph in water": "pH em H₂O",
+    "phosphorus soil": "P - disponível",
+    "potassium soil": "Potássio trocável (K+)",
+    "potential acidity": "Acidez potencial (H+Al)",
+    "sulfur soil": "Enxofre (S)",
+    "total cation exchange capacity at ph 7.00": "CTC a pH 7,0 (T)",
+    "total organic carbon soil": "Carbono orgânico total",
+    "zinc soil": "Zinco (Zn)",
+}
+
+# Units per Portuguese parameter name
+PARAMETER_UNITS = {
+    "Cálcio trocável (Ca2+)": "cmolc/dm³",
+    "Magnésio trocável (Mg2+)": "cmolc/dm³", 
+    "Potássio trocável (K+)": "mg/dm³",
+    "Matéria orgânica (MO)": "dag/kg",
+    "P - disponível": "mg/dm³",
+    "Acidez trocável (Al3+)": "cmolc/dm³",
+    "Acidez potencial (H+Al)": "cmolc/dm³",
+    "CTC efetiva (t)": "cmolc/dm³",
+    "CTC a pH 7,0 (T)": "cmolc/dm³",
+    "pH em CaCl₂": "",
+    "pH em H₂O": "",
+    "Saturação por bases (V%)": "%",
+    "Saturação por alumínio (m%)": "%",
+    "Cobre (Cu)": "mg/dm³",
+    "Ferro (Fe)": "mg/dm³",
+    "Manganês (Mn)": "mg/dm³",
+    "Zinco (Zn)": "mg/dm³",
+    "Enxofre (S)": "mg/dm³",
+    "Carbono orgânico total": "g/kg",
+    "Boro (B)": "mg/dm³",
+    "P disponível (Resina, Sequeiro)": "mg/dm³",
+    "P disponível (Resina, Irrigado)": "mg/dm³",
+}
+
+# The unit, label and threshold lookups also resolve boron; classification and display
+# names do not, so boron results stay unclassified
+LOOKUP_PARAMETER_TRANSLATIONS = {**PARAMETER_TRANSLATIONS, "boron soil": "Boro (B)"}
+
+ParameterInfo = namedtuple('ParameterInfo', ['name', 'unit', 'classifications', 'thresholds'])
+
+def get_parameter_translations():
+    """Get parameter translations from English to Portuguese"""
+    return PARAMETER_TRANSLATIONS
+
+def _fuzzy_match_parameter(param_lower, candidates):
+    """Return the first candidate that contains, or is contained in, the lower-cased parameter name"""
+    for candidate in candidates:
+        if param_lower in candidate.lower() or candidate.lower() in param_lower:
+            return candidate
+    return None
+
+def format_threshold_range(min_val, max_val):
+    """Format a classification range for map legends"""
+    if max_val == float('inf'):
+        return f"> {min_val:.1f}"
+    elif min_val == 0 and max_val < 1:
+        return f"≤ {max_val:.2f}"
+    elif min_val == 0:
+        return f"≤ {max_val:.1f}"
+    else:
+        return f"{min_val:.2f} - {max_val:.1f}"
+
+@lru_cache(maxsize=256)
+def resolve_parameter(param):
+    """
+    Resolve a raw parameter name (English or Portuguese, any case) once and cache the result.
+    
+    ``name`` is the Portuguese name classification looks up (the raw name when there is no
+    translation). Unit, classification labels and thresholds resolve through
+    LOOKUP_PARAMETER_TRANSLATIONS and fall back to the substring fuzzy match against the
+    default tables when the name has no exact entry.
+    """
+    param_lower = param.lower()
+    name = PARAMETER_TRANSLATIONS.get(param_lower, param)
+    lookup_name = LOOKUP_PARAMETER_TRANSLATIONS.get(param_lower, param)
+    
+    # Unit: exact match first, then fuzzy match on Portuguese and English names
+    if lookup_name in PARAMETER_UNITS:
+        unit = PARAMETER_UNITS[lookup_name]
+    else:
+        unit_key = _fuzzy_match_parameter(param_lower, list(PARAMETER_UNITS) + list(LOOKUP_PARAMETER_TRANSLATIONS))
+        unit = PARAMETER_UNITS.get(LOOKUP_PARAMETER_TRANSLATIONS.get(unit_key, unit_key), "")
+    
+    # Classification labels and thresholds: exact match first, then fuzzy match
+    all_params = {**PARAMS_MB_DEFAULT, **PARAMS_BA_DEFAULT}
+    matched_param = lookup_name if lookup_name in all_params else _fuzzy_match_parameter(param_lower, all_params)
+    ranges = all_params.get(matched_param, [])
+    
+    thresholds = {}
+    for min_val, max_val, classification in ranges:
+        thresholds.setdefault(classification, format_threshold_range(min_val, max_val))
+    
+    # Read-only, since every caller shares the cached result
+    return ParameterInfo(name, unit, tuple(classification for _, _, classification in ranges),
+                         MappingProxyType(thresholds))
+
+def get_parameter_unit(param):
+    """Get the unit for a parameter"""
+    return resolve_parameter(param).unit
+
+def get_parameter_classifications(param):
+    """Get the specific classifications defined for a parameter"""
+    return list(resolve_parameter(param).classifications)
+
+def get_parameter_thresholds(param, classification):
+    """Get threshold ranges for a parameter and classification"""
+    return resolve_parameter(param).thresholds.get(classification, "")
+
+def get_column_translations():
+    """Get column name translations from English to Portuguese"""
+    return {
+        "plot_type": "Tratamento",
+        "sampling_plan_purpose": "Data amostragem",
+        "depth_range_top_m": "profundidade superior",
+        "depth_range_bottom_m": "profundidade inferior",
+        "campo_sample_number": "ID-LAB-CAMPO",
+        "translated_standard_parameter": "Parâmetro",
+        "numeric_result": "Resultado numérico",
+        "unit_pad": "Unidade",
+        "geometry": "geometria",
+        "field_id": "Talhão",
+    }
+
+def translate_classification_to_english(portuguese_classification):
+    """Translate Portuguese classifications to English"""
+    translation_map = {
+        "Muito Baixo": "Very Low",
+        "Baixo": "Low", 
+        "Médio": "Medium",
+        "Bom": "Good",
+        "Muito Bom": "Very Good",
+        "Alto": "High",
+        "Muito Alto": "Very High",
+        "Classificação não definida": "Classification not defined",
+        "Não classificado": "Not classified"
+    }
+    return translation_map.get(portuguese_classification, portuguese_classification)
+
+def translate_parameter_to_english(portuguese_parameter):
+    """Translate Portuguese parameter names back to original English names"""
+    # Reverse mapping of the parameter translations
+    parameter_translation_map = {
+        "Saturação por alumínio (m%)": "aluminum saturation",
+        "Acidez trocável (Al3+)": "aluminum soil",
+        "Saturação por bases (V%)": "base saturation",
+        "Cálcio trocável (Ca2+)": "calcium soil",
+        "Cobre (Cu)": "copper soil",
+        "CTC efetiva (t)": "effective cation exchange capacity",
+        "Ferro (Fe)": "iron soil",
+        "Magnésio trocável (Mg2+)": "magnesium soil",
+        "Manganês (Mn)": "manganese soil",
+        "Matéria orgânica (MO)": "organic matter",
+        "pH em CaCl₂": "ph in cacl2",
+        "pH em H₂O": "ph in water",
+        "P - disponível": "phosphorus soil",
+        "Potássio trocável (K+)": "potassium soil",
+        "Acidez potencial (H+Al)": "potential acidity",
+        "Enxofre (S)": "sulfur soil",
+        "CTC a pH 7,0 (T)": "total cation exchange capacity at ph 7.00",
+        "Carbono orgânico total": "total organic carbon soil",
+        "Zinco (Zn)": "zinc soil",
+    }
+    return parameter_translation_map.get(portuguese_parameter, portuguese_parameter)
+
+def translate_column_names_to_english(df):
+    """Translate Portuguese column names back to original English names"""
+    column_translation_map = {
+        "Tratamento": "plot_type",
+        "Data amostragem": "sampling_plan_purpose", 
+        "profundidade superior": "depth_range_top_m",
+        "profundidade inferior": "depth_range_bottom_m",
+        "ID-LAB-CAMPO": "campo_sample_number",
+        "Parâmetro": "translated_standard_parameter",
+        "Resultado numérico": "numeric_result",
+        "Unidade": "unit_pad",
+        "geometria": "geometry",
+        "Classificação": "Classification",
+        "Classificação_Média": "Mean_Classification",
+        "N_Amostras": "N_Samples",
+        "Média": "Mean",
+        "Mediana": "Median", 
+        "Desvio_Padrão": "Std_Deviation",
+        "Mínimo": "Minimum",
+        "Máximo": "Maximum"
+    }
+    
+    # Rename columns
+    df_translated = df.rename(columns=column_translation_map)
+    
+    # Translate classification column values if it exists
+    classification_cols = ["Classification", "Mean_Classification"]
+    for col in classification_cols:
+        if col in df_translated.columns:
+            df_translated[col] = df_translated[col].apply(translate_classification_to_english)
+    
+    # Translate parameter names back to English if the parameter column exists
+    parameter_cols = ["translated_standard_parameter"]
+    for col in parameter_cols:
+        if col in df_translated.columns:
+            df_translated[col] = df_translated[col].apply(translate_parameter_to_english)
+    
+    return df_translated
+
+def apply_excel_colors(worksheet, classification_col_name="Classificação"):
+    """Apply color formatting to the classification column in Excel"""
+    from openpyxl.styles import PatternFill
+    
+    
+    # Color palette matching the original specification
+    color_fills = {
+        "Muito Baixo": PatternFill(start_color="FF4C4C", end_color="FF4C4C", fill_type="solid"),  # vermelho
+        "Baixo":       PatternFill(start_color="FFA04C", end_color="FFA04C", fill_type="solid"),  # laranja
+        "Médio":       PatternFill(start_color="FFE14C", end_color="FFE14C", fill_type="solid"),  # amarelo
+        "Bom":         PatternFill(start_color="9BEA8C", end_color="9BEA8C", fill_type="solid"),  # verde claro
+        "Muito Bom":   PatternFill(start_color="4CD964", end_color="4CD964", fill_type="solid"),  # verde médio
+        "Alto":        PatternFill(start_color="4CD964", end_color="4CD964", fill_type="solid"),  # verde médio
+        "Muito Alto":  PatternFill(start_color="1F7A1F", end_color="1F7A1F", fill_type="solid"),  # verde escuro
+        
+        # English translations
+        "Very Low": PatternFill(start_color="FF4C4C", end_color="FF4C4C", fill_type="solid"),
+        "Low":      PatternFill(start_color="FFA04C", end_color="FFA04C", fill_type="solid"),
+        "Medium":   PatternFill(start_color="FFE14C", end_color="FFE14C", fill_type="solid"),
+        "Good":     PatternFill(start_color="9BEA8C", end_color="9BEA8C", fill_type="solid"),
+        "Very Good": PatternFill(start_color="4CD964", end_color="4CD964", fill_type="solid"),
+        "High":     PatternFill(start_color="4CD964", end_color="4CD964", fill_type="solid"),
+        "Very High": PatternFill(start_color="1F7A1F", end_color="1F7A1F", fill_type="solid"),
+        
+        # Additional variations and non-classified values
+        "Classificação não definida": PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid"),  # cinza claro
+        "Não classificado": PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid"),  # cinza claro
+    }
+    
+    # Find the classification column
+    header = {}
+    for idx, cell in enumerate(worksheet[1], start=1):
+        if cell.value:
+            header[cell.value] = idx
+    
+    classification_col = header.get(classification_col_name)
+    if not classification_col:
+        return  # Column not found
+    
+    # Apply colors to classification cells
+    for row_num in range(2, worksheet.max_row + 1):  # Start from row 2 (skip header)
+        cell = worksheet.cell(row=row_num, column=classification_col)
+        classification_value = str(cell.value).strip() if cell.value else ""
+        
+        if classification_value in color_fills:
+            cell.fill = color_fills[classification_value]
+
+def create_medias_sheet(writer, classified_df, param_col, value_col, language='pt', classifier=None):
+    """
+    Create medias (averages) sheet by plot_type with color-coded classifications
+    
+    Args:
+        writer: Excel writer object
+        classified_df: DataFrame with classified data
+        param_col: Parameter column name (user-selected, could be 'translated_standard_parameter' or other)
+        value_col: Value column name (user-selected, could be 'numeric_result' or other)
+        language: Language for output ('pt' or 'en')
+        classifier: SoilClassifier whose compiled ranges are reused (a default one is built if omitted)
+    """
+    try:
+        if classifier is None:
+            classifier = SoilClassifier()
+        
+        # Get the actual column names based on the data language
+        # Check what columns exist in the dataframe
+        plot_type_col = None
+        depth_col = None
+        
+        # Try to find plot_type column (could be 'Tratamento' in PT or 'plot_type' in EN)
+        if 'Tratamento' in classified_df.columns:
+            plot_type_col = 'Tratamento'
+        elif 'plot_type' in classified_df.columns:
+            plot_type_col = 'plot_type'
+            
+        # Try to find depth column (could be 'profundidade inferior' in PT or 'depth_range_bottom_m' in EN)
+        if 'profundidade inferior' in classified_df.columns:
+            depth_col = 'profundidade inferior'
+        elif 'depth_range_bottom_m' in classified_df.columns:
+            depth_col = 'depth_range_bottom_m'
+        
+        # Check if required columns exist
+        required_cols = [plot_type_col, 'sampling_plan_purpose', depth_col]
+        missing_cols = [col for col in required_cols if col is None or col not in classified_df.columns]
+        if missing_cols or param_col not in classified_df.columns or value_col not in classified_df.columns:
+            print(f"Missing columns for medias sheet: {missing_cols}")
+            print(f"Available columns: {list(classified_df.columns)}")
+            return
+        
+        # Group by parameter, plot_type, sampling_plan_purpose, and depth, calculate mean and classification
+        medias_data = []
+        
+        for param in classified_df[param_col].unique():
+            param_data = classified_df[classified_df[param_col] == param]
+            
+            for plot_type in param_data[plot_type_col].unique():
+                plot_data = param_data[param_data[plot_type_col] == plot_type]
+                
+                for purpose in plot_data['sampling_plan_purpose'].unique():
+                    purpose_data = plot_data[plot_data['sampling_plan_purpose'] == purpose]
+                    
+                    for depth in purpose_data[depth_col].unique():
+                        depth_data = purpose_data[purpose_data[depth_col] == depth]
+                        
+                        if not depth_data.empty:
+                            mean_value = depth_data[value_col].mean()
+                            
+                            # Get classification for the mean value using the original parameter name
+                            # Use the parameter name as it appears in the data (could be English or Portuguese)
+                            classification = classifier.classify_value(param, mean_value)
+                            
+                            # Translate classification for display
+                            translated_classification = translate_classification(classification, language)
+                            
+                            if language == 'en':
+                                medias_data.append({
+                                    'Parameter': param,
+                                    'Plot_Type': plot_type,
+                                    'Sampling_Purpose': purpose,
+                                    'Depth': depth,
+                                    'Mean_Value': round(mean_value, 3),
+                                    'Classification': translated_classification
+                                })
+                            else:
+                                medias_data.append({
+                                    'Parâmetro': param,
+                                    'Tipo_Plot': plot_type,
+                                    'Propósito_Amostragem': purpose,
+                                    'Profundidade': depth,
+                                    'Valor_Médio': round(mean_value, 3),
+                                    'Classificação': translated_classification
+                                })
+        
+        if medias_data:
+            medias_df = pd.DataFrame(medias_data)
+            
+            # Sort by parameter, plot_type, purpose, and depth
+            if language == 'en':
+                medias_df = medias_df.sort_values(['Parameter', 'Plot_Type', 'Sampling_Purpose', 'Depth'])
+                classification_col = 'Classification'
+                sheet_name = 'Means'
+            else:
+                medias_df = medias_df.sort_values(['Parâmetro', 'Tipo_Plot', 'Propósito_Amostragem', 'Profundidade'])
+                classification_col = 'Classificação'
+                sheet_name = 'Médias'
+            
+            # Write to Excel
+            medias_df.to_excel(writer, sheet_name=sheet_name, index=False)
+            
+            # Apply colors to the classification column
+            apply_excel_colors(writer.book[sheet_name], classification_col)
+            
+            print(f"Created medias sheet with {len(medias_data)} rows")
+        else:
+            print("No data found for medias sheet")
+            
+    except Exception as e:
+        print(f"Error creating medias sheet: {e}")
+
+def create_color_legend_sheet(workbook, language='pt'):
+    """Create a color legend sheet in the workbook"""
+    from openpyxl.styles import PatternFill
+    
+    
+    # Define sheet names and headers based on language
+    if language == 'en':
+        sheet_name = "Color_Legend"
+        header1 = "Classification"
+        header2 = "Color"
+        color_definitions = [
+            ("Very Low", "FF4C4C"),
+            ("Low", "FFA04C"),
+            ("Medium", "FFE14C"),
+            ("Good", "9BEA8C"),
+            ("Very Good", "4CD964"),
+            ("High", "4CD964"),
+            ("Very High", "1F7A1F")
+        ]
+    else:
+        sheet_name = "Legenda_Cores"
+        header1 = "Classificação"
+        header2 = "Cor"
+        color_definitions = [
+            ("Muito Baixo", "FF4C4C"),
+            ("Baixo", "FFA04C"),
+            ("Médio", "FFE14C"),
+            ("Bom", "9BEA8C"),
+            ("Muito Bom", "4CD964"),
+            ("Alto", "4CD964"),
+            ("Muito Alto", "1F7A1F")
+        ]
+    
+    # Remove existing legend sheet if it exists
+    for sheet_name_to_check in ["Legenda_Cores", "Color_Legend"]:
+        if sheet_name_to_check in workbook.sheetnames:
+            workbook.remove(workbook[sheet_name_to_check])
+    
+    # Create new legend sheet
+    legend_sheet = workbook.create_sheet(sheet_name)
+    
+    # Headers
+    legend_sheet.cell(row=1, column=1, value=header1)
+    legend_sheet.cell(row=1, column=2, value=header2)
+    
+    # Add legend entries
+    for row_idx, (classification, color_code) in enumerate(color_definitions, start=2):
+        # Classification name
+        legend_sheet.cell(row=row_idx, column=1, value=classification)
+        
+        # Color cell
+        color_cell = legend_sheet.cell(row=row_idx, column=2, value="")
+        color_cell.fill = PatternFill(start_color=color_code, end_color=color_code, fill_type="solid")
+    
+    # Adjust column widths
+    legend_sheet.column_dimensions['A'].width = 15
+    legend_sheet.column_dimensions['B'].width = 10
+
+def kriging_point_mask(points_gdf, parameter_name, param_col, purpose_filter=None, depth_filter=None):
+    """Boolean array marking the sample points of one parameter, optionally for a sampling purpose and depth"""
+    mask = np.ones(len(points_gdf), dtype=bool)
+    
+    if param_col in points_gdf.columns:
+        mask &= (points_gdf[param_col] == parameter_name).to_numpy()
+    
+    if purpose_filter and 'sampling_plan_purpose' in points_gdf.columns:
+        mask &= (points_gdf['sampling_plan_purpose'] == purpose_filter).to_numpy()
+        
+    if depth_filter and 'depth_range_bottom_m' in points_gdf.columns:
+        mask &= (points_gdf['depth_range_bottom_m'] == depth_filter).to_numpy()
+    
+    return mask
+
+def build_kriging_map_job(points_gdf, polygon_gdf, parameter_name, classifier, param_col, value_col,
+                          purpose_filter=None, depth_filter=None, grid_res=None, language='pt'):
+    """
+    Describe the kriging map of one parameter as a picklable job for utils.kriging
+    
+    Translations, legends and cache keys are resolved here because worker processes
+    have no Streamlit session. Returns (job, None), or (None, error message).
+    """
+    from utils.kriging import choose_grid_resolution
+    from utils.kriging_cache import KRIGING_CACHE, kriging_cache_key, map_image_key
+    from utils.spatial import prepare_field
+    from utils.variogram import cached_variogram
+    
+    # Check if parameter has valid classifications defined
+    parameter_classifications = get_parameter_classifications(parameter_name)
+    if not parameter_classifications:
+        return None, f"No classification labels defined for parameter: {parameter_name}"
+    
+    # Filter points data
+    point_mask = kriging_point_mask(points_gdf, parameter_name, param_col, purpose_filter, depth_filter)
+    if not point_mask.any():
+        return None, "No data points found for the selected criteria"
+    
+    # Get coordinates (in metres, projected once per field) and values
+    field = prepare_field(points_gdf, polygon_gdf)
+    x = field.points_x[point_mask]
+    y = field.points_y[point_mask]
+    z = points_gdf[value_col].values[point_mask]
+    
+    # Maps are rendered once at 300 DPI for the app and the reports alike
+    if not grid_res:
+        grid_res = choose_grid_resolution(field.polygons_metric, len(z), dpi=300)
+    
+    # Set title
+    title = f"Kriging Map - {translate_parameter_for_display(parameter_name, language)}"
+    if purpose_filter:
+        title += f" ({purpose_filter})"
+    if depth_filter:
+        title += f" - Depth: {depth_filter}m"
+    
+    # Legend with classification levels, ranges, and units
+    classification_colors = get_classification_colors()
+    legend_entries = []
+    for classification in parameter_classifications:
+        if classification in classification_colors:
+            translated_class = translate_classification(classification, language)
+            threshold_ranges = get_parameter_thresholds(parameter_name, classification)
+            label = f"{translated_class}: {threshold_ranges}" if threshold_ranges else f"{translated_class}"
+            legend_entries.append((classification_colors[classification], label))
+    
+    param_unit = get_parameter_unit(parameter_name)
+    legend_title = f'Classification Levels ({param_unit})' if param_unit else 'Classification Levels'
+    
+    compiled = classifier.get_compiled_ranges(parameter_name)
+    cache_key = kriging_cache_key(x, y, z, field.polygons, parameter_name, purpose_filter, depth_filter,
+                                  grid_res, compiled=compiled)
+    
+    return {
+        'parameter': parameter_name,
+        'x': x,
+        'y': y,
+        'z': z,
+        'polygon_gdf': field.polygons,
+        'kriging_crs': field.kriging_crs,
+        'compiled': compiled,
+        'palette': get_classification_palette(compiled.labels if compiled else ["Classificação não definida"]),
+        'grid_res': grid_res,
+        'cache_key': cache_key,
+        'image_key': map_image_key(cache_key, title, legend_entries, legend_title),
+        # Surfaces and variograms already fitted are reused
+        'surface': KRIGING_CACHE.get(cache_key),
+        'variogram': cached_variogram(x, y, z),
+        'title': title,
+        'legend_entries': legend_entries,
+        'legend_title': legend_title
+    }, None
+
+def create_kriging_map(points_gdf, polygon_gdf, parameter_name, classifier, param_col, value_col, 
+                      purpose_filter=None, depth_filter=None, grid_res=None, language='pt'):
+    """Create kriging map for a specific parameter (grid_res=None picks it from the field and samples)"""
+    from utils.kriging import create_classified_raster
+    
+    try:
+        job, error = build_kriging_map_job(points_gdf, polygon_gdf, parameter_name, classifier, param_col,
+                                           value_col, purpose_filter, depth_filter, grid_res, language)
+        if job is None:
+            return None, None, None, None, error
+        
+        # Krige, classify and color the surface (white outside the polygon), reusing cached surfaces
+        rgb_image, bounds, xi, yi = create_classified_raster(
+            job['x'], job['y'], job['z'], job['polygon_gdf'], job['compiled'], job['palette'], job['grid_res'],
+            cache_key=job['cache_key'], surface=job['surface'], kriging_crs=job['kriging_crs']
+        )
+        
+        return rgb_image, bounds, xi, yi, None
+        
+    except Exception as e:
+        return None, None, None, None, f"Error creating kriging map: {str(e)}"
+
+def get_kriging_map_image(points_gdf, polygon_gdf, parameter_name, classifier, param_col, value_col,
+                          purpose_filter=None, depth_filter=None, grid_res=None, language='pt'):
+    """
+    Render the kriging map of a parameter as PNG bytes, once per map
+    
+    The same cached image is shown in the app, offered as the PNG download and
+    embedded in the PDF and DOCX reports. Returns (image, error).
+    """
+    from utils.kriging import generate_report_map, store_map_result
+    from utils.kriging_cache import MAP_IMAGE_CACHE
+    
+    try:
+        job, error = build_kriging_map_job(points_gdf, polygon_gdf, parameter_name, classifier, param_col,
+                                           value_col, purpose_filter, depth_filter, grid_res, language)
+        if job is None:
+            return None, error
+        
+        image = MAP_IMAGE_CACHE.get(job['image_key'])
+        if image is None:
+            image = store_map_result(job, generate_report_map(job))['image']
+        
+        return image, None
+        
+    except Exception as e:
+        return None, f"Error creating kriging map: {str(e)}"
+
+def get_classification_colors():
+    """Get classification colors for visualization"""
+    return {
+        "Muito Baixo": "#070707",
+        "Baixo": "#d7191c", 
+        "Médio": "#ffa849",
+        "Bom": "#abdda4",
+        "Muito Bom": "#2b83ba",
+        "Alto": "#4CD964",
+        "Muito Alto": "#1F7A1F",
+        "Classificação não definida": "#E0E0E0",
+        "Valor inválido": "#E0E0E0"
+    }
+
+def get_classification_palette(labels):
+    """Get an RGB palette (uint8, one row per label) for indexing category rasters"""
+    classification_colors = get_classification_colors()
+    palette = np.full((len(labels), 3), 255, dtype=np.uint8)
+    for i, label in enumerate(labels):
+        if label in classification_colors:
+            hex_color = classification_colors[label]
+            palette[i] = [int(hex_color[j:j+2], 16) for j in (1, 3, 5)]
+    return palette
+
+def create_comprehensive_statistics_with_classification(df, grouping_cols, param_col, value_col, language='pt', classifier=None):
+    """
+    Create comprehensive statistics grouped by specified columns with mean classification
+    """
+    # Check if all grouping columns exist
+    existing_cols = [col for col in grouping_cols if col in df.columns]
+    if not existing_cols:
+        return None
+    
+    # Add parameter column to grouping
+    group_cols = existing_cols + [param_col]
+    
+    try:
+        # Calculate comprehensive statistics
+        stats_df = df.groupby(group_cols)[value_col].agg([
+            'count',   # N_Amostras / N_Samples
+            'mean',    # Média / Mean
+            'median',  # Mediana / Median
+            'std',     # Desvio_Padrão / Std_Deviation
+            'min',     # Mínimo / Minimum
+            'max',     # Máximo / Maximum
+        ]).round(4).reset_index()
+        
+        # Rename columns based on language
+        if language == 'en':
+            stats_df.columns = existing_cols + [param_col, 'N_Samples', 'Mean', 'Median', 'Std_Deviation', 'Minimum', 'Maximum']
+            classification_col = 'Mean_Classification'
+        else:
+            stats_df.columns = existing_cols + [param_col, 'N_Amostras', 'Média', 'Mediana', 'Desvio_Padrão', 'Mínimo', 'Máximo']
+            classification_col = 'Classificação_Média'
+        
+        # Apply classification to the mean values
+        if classifier is None:
+            classifier = SoilClassifier()
+        mean_col = 'Mean' if language == 'en' else 'Média'
+        stats_df[classification_col] = classifier.classify_values(stats_df[param_col], stats_df[mean_col])
+        
+        # Translate classifications if English
+        if language == 'en':
+            stats_df[classification_col] = stats_df[classification_col].apply(translate_classification_to_english)
+            
+            # Also translate the column names to English (including grouping columns)
+            stats_df = translate_column_names_to_english(stats_df)
+        
+        # Sort by grouping columns and parameter
+        sort_cols = list(stats_df.columns[:len(existing_cols)]) + [list(stats_df.columns)[len(existing_cols)]]  # First few columns + parameter column
+        stats_df = stats_df.sort_values(sort_cols)
+        
+        return stats_df
+        
+    except Exception as e:
+        print(f"Error creating comprehensive statistics: {e}")
+        return None
@@ -0,0 +1,86 @@
+"""Vectorized classification must give the labels of the original per-row classify_value"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from soil_core import PARAMS_BA_DEFAULT, PARAMS_MB_DEFAULT, SoilClassifier, get_parameter_translations
+
+
+def reference_classify_value(classifier, param_name, value):
+    """classify_value as it was before classification was vectorized, one row at a time"""
+    try:
+        value = float(value)
+    except:
+        return "Valor inválido"
+
+    portuguese_param_name = get_parameter_translations().get(param_name.lower(), param_name)
+    for params in (classifier.params_mb, classifier.params_ba):
+        if portuguese_param_name in params:
+            ranges = params[portuguese_param_name]
+            for min_val, max_val, classification in ranges:
+                if min_val <= value < max_val:
+                    return classification
+            min_distance = float('inf')
+            nearest_classification = None
+            for min_val, max_val, classification in ranges:
+                distance = abs(value - (min_val + max_val) / 2)
+                if distance < min_distance:
+                    min_distance = distance
+                    nearest_classification = classification
+            return nearest_classification if nearest_classification else ranges[-1][2]
+    return "Classificação não definida"
+
+
+def parameter_names():
+    return sorted({**PARAMS_MB_DEFAULT, **PARAMS_BA_DEFAULT}) + sorted(get_parameter_translations()) + [
+        "boron soil", "Parâmetro desconhecido"]
+
+
+def sample_values(param_name):
+    """Every range bound and the values just around it, plus gaps, extremes and invalid input"""
+    ranges = {**PARAMS_BA_DEFAULT, **PARAMS_MB_DEFAULT}.get(
+        get_parameter_translations().get(param_name.lower(), param_name), [])
+    bounds = [bound for min_val, max_val, _ in ranges for bound in (min_val, max_val) if np.isfinite(bound)]
+    values = [value + offset for value in bounds for offset in (-1e-9, 0.0, 1e-9, -0.01, 0.01)]
+    return values + [-100.0, -0.5, 0.0, 1e6, float('inf'), float('-inf'), float('nan'), "7,5", "abc", None, "3.5"]
+
+
+@pytest.mark.parametrize("param_name", parameter_names())
+def test_classify_value_matches_reference(param_name):
+    classifier = SoilClassifier()
+    for value in sample_values(param_name):
+        assert classifier.classify_value(param_name, value) == reference_classify_value(classifier, param_name, value), value
+
+
+def test_classify_dataframe_matches_reference():
+    classifier = SoilClassifier()
+    rows = [(param_name, value) for param_name in parameter_names() for value in sample_values(param_name)]
+    df = pd.DataFrame(rows, columns=["Parâmetro", "Resultado numérico"])
+
+    classified = classifier.classify_dataframe(df)
+
+    for (param_name, value), label in zip(rows, classified["Classificação"]):
+        assert label == reference_classify_value(classifier, param_name, value), (param_name, value)
+    assert "Classificação" not in df.columns
+
+
+def test_random_values_match_reference():
+    classifier = SoilClassifier()
+    rng = np.random.default_rng(0)
+    param_names = rng.choice(parameter_names(), 5000)
+    values = np.concatenate([rng.uniform(-5, 150, 2500), rng.uniform(0, 10, 2500).round(1)])
+
+    labels = classifier.classify_values(param_names, values)
+
+    assert list(labels) == [reference_classify_value(classifier, param_name, value)
+                            for param_name, value in zip(param_names, values)]
+
+
+def test_custom_parameter_is_compiled():
+    classifier = SoilClassifier()
+    classifier.add_custom_parameter("Teste", [(0, 10, "Baixo"), (10, 20, "Alto")])
+    classifier.add_custom_parameter("pH em CaCl₂", [(0, 5, "Ácido"), (5, 14, "Neutro")], param_type="BA")
+
+    assert list(classifier.classify_values(["Teste", "Teste", "Teste"], [5, 15, 50])) == ["Baixo", "Alto", "Alto"]
+    for value in (3, 5, 9):
+        assert classifier.classify_value("pH em CaCl₂", value) == reference_classify_value(classifier, "pH em CaCl₂", value)
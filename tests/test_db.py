@@ -0,0 +1,86 @@
+"""Chunked reads: concat_chunks and streamed read_pd_from_db_sql"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from utils.db import concat_chunks, iter_pd_from_db_sql, read_pd_from_db_sql
+
+
+def test_concat_chunks_unifies_categories():
+    first = pd.DataFrame({'parameter': pd.Categorical(['pH', 'K']), 'value': [5.2, 1.0]})
+    second = pd.DataFrame({'parameter': pd.Categorical(['P', 'pH']), 'value': [12.0, 6.1]}, index=[7, 8])
+
+    combined = concat_chunks([first, second])
+
+    assert isinstance(combined['parameter'].dtype, pd.CategoricalDtype)
+    assert sorted(combined['parameter'].cat.categories) == ['K', 'P', 'pH']
+    assert list(combined['parameter']) == ['pH', 'K', 'P', 'pH']
+    assert list(combined['value']) == [5.2, 1.0, 12.0, 6.1]
+    assert list(combined.index) == [0, 1, 2, 3]
+
+
+def test_concat_chunks_leaves_its_input_alone():
+    first = pd.DataFrame({'parameter': pd.Categorical(['pH'])})
+    second = pd.DataFrame({'parameter': pd.Categorical(['K'])})
+
+    concat_chunks([first, second])
+
+    assert list(first['parameter'].cat.categories) == ['pH']
+    assert list(second['parameter'].cat.categories) == ['K']
+
+
+def test_concat_chunks_mixed_and_missing_columns():
+    first = pd.DataFrame({'parameter': pd.Categorical(['pH']), 'unit': pd.Categorical(['%'])})
+    second = pd.DataFrame({'parameter': ['K']})
+
+    combined = concat_chunks([first, second])
+
+    assert list(combined['parameter']) == ['pH', 'K']
+    assert combined['unit'].isna().tolist() == [False, True]
+
+
+def test_concat_chunks_empty_and_single():
+    assert concat_chunks([]).empty
+    only = pd.DataFrame({'value': [1.0]})
+    assert concat_chunks(iter([only])) is only
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'samples.db'}")
+    pd.DataFrame({
+        'field_id': [1, 2, 3] * 400,
+        'translated_standard_parameter': ['pH em CaCl₂', 'P - disponível', 'Boro (B)'] * 400,
+        'numeric_result': [5.2, 12.7, 0.3] * 400,
+    }).to_sql('results', engine, index=False)
+    with Session(bind=engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_streamed_read_matches_plain_read(session):
+    query = "SELECT * FROM results WHERE field_id >= :field_id ORDER BY rowid"
+
+    plain = read_pd_from_db_sql(query, session, params={'field_id': 2})
+    streamed = read_pd_from_db_sql(query, session, params={'field_id': 2}, chunksize=150)
+
+    pd.testing.assert_frame_equal(plain, streamed)
+
+
+def test_typed_chunks_keep_categories_across_chunks(session):
+    dtype = {'translated_standard_parameter': 'category', 'numeric_result': 'float32', 'missing': 'category'}
+
+    chunks = list(iter_pd_from_db_sql("SELECT * FROM results ORDER BY rowid", session, chunksize=500, dtype=dtype))
+    combined = read_pd_from_db_sql("SELECT * FROM results ORDER BY rowid", session, chunksize=500, dtype=dtype)
+
+    assert [len(chunk) for chunk in chunks] == [500, 500, 200]
+    assert combined['numeric_result'].dtype == 'float32'
+    assert isinstance(combined['translated_standard_parameter'].dtype, pd.CategoricalDtype)
+    assert combined['translated_standard_parameter'].value_counts().to_dict() == {
+        'Boro (B)': 400, 'P - disponível': 400, 'pH em CaCl₂': 400}
+
+
+def test_streamed_read_errors_are_raised(session):
+    with pytest.raises(Exception, match="no such table"):
+        read_pd_from_db_sql("SELECT * FROM missing", session, chunksize=10)
@@ -0,0 +1,158 @@
+"""Local field snapshots: the store itself and the snapshot-aware loaders in soil_core"""
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+import soil_core
+from utils.snapshots import FieldSnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FieldSnapshotStore(str(tmp_path / 'snapshots'), max_age=3600)
+
+
+def samples(field_id):
+    return pd.DataFrame({'field_id': [field_id, field_id], 'translated_standard_parameter': ['pH em CaCl₂', 'Boro (B)'],
+                         'numeric_result': [5.2, 0.3]})
+
+
+def boundary(field_id):
+    return gpd.GeoDataFrame({'field_id': [field_id]}, geometry=[box(-47.1, -22.9, -47.0, -22.8)], crs='EPSG:4326')
+
+
+class FakeDatabase:
+    """Stands in for the soil_core retrieve functions; records calls and can go offline"""
+
+    def __init__(self, monkeypatch):
+        self.versions = {1: ('2026-01-01 00:00:00', 2), 2: ('2026-01-02 00:00:00', 2)}
+        self.online = True
+        self.calls = []
+        monkeypatch.setattr(soil_core, 'retrieve_sample_versions', self.retrieve_sample_versions)
+        monkeypatch.setattr(soil_core, 'retrieve_soil_samples_for_fields', self.retrieve_soil_samples_for_fields)
+        monkeypatch.setattr(soil_core, 'retrieve_field_boundaries_for_fields', self.retrieve_field_boundaries_for_fields)
+
+    def check(self, name, field_ids):
+        if not self.online:
+            raise RuntimeError('connection refused')
+        self.calls.append((name, tuple(field_ids)))
+
+    def retrieve_sample_versions(self, field_ids):
+        self.check('versions', field_ids)
+        return {field_id: self.versions[field_id] for field_id in field_ids if field_id in self.versions}
+
+    def retrieve_soil_samples_for_fields(self, field_ids, variant=None):
+        self.check('samples', field_ids)
+        return {field_id: samples(field_id) if field_id in self.versions else pd.DataFrame() for field_id in field_ids}
+
+    def retrieve_field_boundaries_for_fields(self, field_ids):
+        self.check('boundaries', field_ids)
+        return {field_id: boundary(field_id) if field_id in self.versions else None for field_id in field_ids}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    return FakeDatabase(monkeypatch)
+
+
+def test_put_and_get_round_trip(store):
+    store.put(1, 'samples', samples(1), 'v1', sample_rows=2)
+    store.put(1, 'boundaries', boundary(1), 'v1')
+    store.put(2, 'samples', None, 'v1')
+
+    snapshot = store.get(1, 'samples', 'v1')
+    pd.testing.assert_frame_equal(snapshot.data, samples(1))
+    assert snapshot.meta['sample_rows'] == 2
+    boundaries = store.get(1, 'boundaries', 'v1').data
+    assert isinstance(boundaries, gpd.GeoDataFrame) and boundaries.crs == 'EPSG:4326'
+    assert store.get(2, 'samples', 'v1').data is None
+    assert store.get(1, 'samples', 'v2') is None
+    assert store.get(3, 'samples', 'v1') is None
+    assert store.fields() == [1, 2]
+
+
+def test_freshness_and_expire(store):
+    store.put(1, 'samples', samples(1), 'v1')
+    assert store.is_fresh(store.get(1, 'samples', 'v1'))
+
+    store.expire()
+    assert not store.is_fresh(store.get(1, 'samples', 'v1'))
+    assert store.get(1, 'samples', 'v1').data is not None
+
+    store.touch(1, 'samples')
+    assert store.is_fresh(store.get(1, 'samples', 'v1'))
+
+
+def test_disabled_store_stores_nothing(tmp_path, database):
+    disabled = FieldSnapshotStore(None)
+
+    disabled.put(1, 'samples', samples(1), 'v1')
+
+    assert not disabled.enabled
+    assert disabled.get(1, 'samples', 'v1') is None and disabled.fields() == []
+    assert soil_core.load_soil_samples_for_fields([1], store=disabled).sources == {1: 'database'}
+    assert database.calls == [('samples', (1,))]
+
+
+def test_fresh_snapshots_skip_the_database(store, database):
+    first = soil_core.load_soil_samples_for_fields([1, 2, 3], store=store)
+    assert first.sources == {1: 'database', 2: 'database', 3: 'database'}
+    database.calls.clear()
+
+    second = soil_core.load_soil_samples_for_fields([3, 1, 2], store=store)
+
+    assert database.calls == []
+    assert second.sources == {1: 'snapshot', 2: 'snapshot', 3: 'snapshot'}
+    assert list(second.data) == [3, 1, 2]
+    pd.testing.assert_frame_equal(second.data[1], samples(1))
+    assert second.data[3].empty
+
+
+def test_stale_snapshots_reload_only_changed_fields(store, database):
+    soil_core.load_soil_samples_for_fields([1, 2], store=store)
+    store.expire()
+    database.versions[2] = ('2026-02-01 00:00:00', 3)
+    database.calls.clear()
+
+    load = soil_core.load_soil_samples_for_fields([1, 2], store=store)
+
+    assert database.calls == [('versions', (1, 2)), ('samples', (2,))]
+    assert load.sources == {1: 'snapshot', 2: 'database'}
+    assert store.is_fresh(store.get(1, 'samples', soil_core.snapshot_version(*soil_core.sample_query_files())))
+
+
+def test_offline_serves_stale_snapshots(store, database):
+    soil_core.load_soil_samples_for_fields([1, 2], store=store)
+    soil_core.load_field_boundaries_for_fields([1], store=store)
+    store.expire()
+    database.online = False
+
+    load = soil_core.load_soil_samples_for_fields([1, 2, 4], store=store)
+    boundaries = soil_core.load_field_boundaries_for_fields([1], store=store)
+
+    assert load.sources == {1: 'offline snapshot', 2: 'offline snapshot', 4: 'missing'}
+    pd.testing.assert_frame_equal(load.data[2], samples(2))
+    assert load.data[4].empty
+    assert boundaries.sources == {1: 'offline snapshot'}
+
+
+def test_offline_without_snapshots_raises(store, database):
+    database.online = False
+
+    with pytest.raises(RuntimeError, match='connection refused'):
+        soil_core.load_soil_samples_for_fields([1], store=store)
+
+
+def test_snapshot_write_errors_keep_database_rows(store, database, monkeypatch):
+    def fail(path, write):
+        raise NotImplementedError('parquet write failed')
+    monkeypatch.setattr(store, '_write_atomic', fail)
+
+    load = soil_core.load_soil_samples_for_fields([1], store=store)
+    boundaries = soil_core.load_field_boundaries_for_fields([1], store=store)
+
+    assert load.sources == {1: 'database'} and boundaries.sources == {1: 'database'}
+    pd.testing.assert_frame_equal(load.data[1], samples(1))
+    version = soil_core.snapshot_version(*soil_core.sample_query_files())
+    assert store.get(1, 'samples', version) is None
@@ -0,0 +1,118 @@
+"""
+Vectorized soil classification helpers.
+
+Range lists use the same ``(min, max, label)`` tuples as PARAMS_MB_DEFAULT and
+PARAMS_BA_DEFAULT. They are compiled into sorted edge arrays so whole columns
+can be classified with ``np.searchsorted`` while giving exactly the same labels
+as SoilClassifier.classify_value: the first matching range in list order wins,
+values outside every range go to the range with the nearest center, and values
+with no finite distance to any center fall back to the last range in the list.
+"""
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+
+class CompiledRanges:
+    """Sorted edge and label arrays for one parameter's classification ranges"""
+
+    def __init__(self, ranges):
+        self.ranges = list(ranges)
+        self.labels = [classification for _, _, classification in self.ranges]
+        self.centers = np.array([(min_val + max_val) / 2 for min_val, max_val, _ in self.ranges], dtype=float)
+
+        edges = sorted({float(bound) for min_val, max_val, _ in self.ranges for bound in (min_val, max_val)})
+        self.edges = np.array(edges, dtype=float)
+
+        # Slot i of searchsorted(edges, value, side='right') holds values in
+        # [edges[i - 1], edges[i]). Slots 0 and len(edges) are never inside a
+        # range; -1 marks a gap that goes to the nearest-center fallback.
+        slots = np.full(len(edges) + 1, -1, dtype=np.intp)
+        for i in range(1, len(edges)):
+            lower, upper = edges[i - 1], edges[i]
+            for range_idx, (min_val, max_val, _) in enumerate(self.ranges):
+                if min_val <= lower and upper <= max_val:
+                    slots[i] = range_idx
+                    break
+        self.slots = slots
+
+        # Plain-Python copies for scalar lookups, so classifying one value is a
+        # bisect over at most a handful of edges with no array allocation
+        self._edge_list = tuple(edges)
+        self._slot_list = tuple(int(slot) for slot in slots)
+        self._center_list = tuple(float(center) for center in self.centers)
+
+    def classify_one(self, value):
+        """Return the index into ``labels`` for a single float value"""
+        slot = self._slot_list[bisect_right(self._edge_list, value)]
+        if slot >= 0:
+            return slot
+
+        nearest, min_distance = len(self.ranges) - 1, float('inf')
+        for range_idx, center in enumerate(self._center_list):
+            distance = abs(value - center)
+            if distance < min_distance:
+                nearest, min_distance = range_idx, distance
+        return nearest
+
+    def classify(self, values):
+        """Return the index into ``labels`` for every value in ``values``"""
+        values = np.asarray(values, dtype=float)
+        codes = self.slots[np.searchsorted(self.edges, values, side='right')]
+        gaps = codes < 0
+        if gaps.any():
+            codes[gaps] = self.nearest(values[gaps])
+        return codes
+
+    def nearest(self, values):
+        """Index of the range whose center is closest to each value"""
+        values = np.asarray(values, dtype=float)
+        with np.errstate(invalid='ignore'):
+            distances = np.abs(values[..., np.newaxis] - self.centers)
+        # classify_value only accepts a distance strictly below inf, so NaN
+        # distances never win and rows without a finite one use the last range
+        distances[np.isnan(distances)] = np.inf
+        nearest = distances.argmin(axis=-1)
+        nearest[np.isinf(distances.min(axis=-1))] = len(self.ranges) - 1
+        return nearest
+
+
+def coerce_values(values):
+    """
+    Convert values to floats the same way ``float(value)`` would.
+
+    Returns the float array and a boolean mask that is False wherever
+    ``float`` would raise, i.e. where classify_value reports "Valor inválido".
+    """
+    series = pd.Series(values)
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+        return series.to_numpy(dtype=float), np.ones(len(series), dtype=bool)
+
+    numeric = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan, copy=True)
+    valid = ~np.isnan(numeric)
+
+    # Anything pandas could not parse gets the exact float() treatment, which
+    # keeps NaN entries and strings such as 'nan' classifiable as before
+    for pos in np.flatnonzero(~valid):
+        try:
+            value = float(series.iat[pos])
+        except Exception:
+            continue
+        numeric[pos] = value
+        valid[pos] = True
+
+    return numeric, valid
+
+
+def classify_grid(compiled, grid):
+    """
+    Classify a float array (e.g. an interpolated kriging surface) with compiled ranges.
+
+    Returns an integer category raster with the grid's shape and the labels its
+    codes index into. ``compiled`` may be None for parameters without ranges.
+    """
+    grid = np.ma.getdata(grid)
+    if compiled is None:
+        return np.zeros(grid.shape, dtype=np.intp), ["Classificação não definida"]
+    return compiled.classify(grid), compiled.labels
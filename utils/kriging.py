@@ -0,0 +1,541 @@
+"""
+Kriging map pipeline that runs without Streamlit.
+
+Everything here only takes plain data (coordinate arrays, GeoDataFrames,
+compiled classification ranges, palettes and pre-translated text) so report
+maps can be produced in worker processes.
+"""
+import io
+import math
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
+from pykrige.ok import OrdinaryKriging
+from scipy.spatial import cKDTree
+from shapely.geometry import mapping
+from rasterio.features import geometry_mask
+from affine import Affine
+
+from utils.classification import classify_grid
+from utils.kriging_cache import KRIGING_CACHE, MAP_IMAGE_CACHE
+from utils.spatial import get_transformer
+from utils.variogram import fit_variogram_parameters, get_variogram, store_variogram, variogram_cache_key
+
+
+# Fields with at least this many points are kriged with local neighborhoods
+# instead of a single global system (which is O(n^3) in the number of points)
+LOCAL_KRIGING_MIN_POINTS = int(os.getenv("LOCAL_KRIGING_MIN_POINTS", "1000"))
+LOCAL_KRIGING_NEIGHBORS = 128
+LOCAL_KRIGING_TILE_SIZE = 32
+
+# Grid resolution policy: about GRID_CELLS_PER_SAMPLE_SPACING cells between
+# neighboring samples, never finer than MIN_GRID_CELL_SIZE_M metres or than
+# the output can show, at least MIN_GRID_RES cells per side and at most
+# MAX_GRID_CELLS cells per map (the cell budget wins over MIN_GRID_RES)
+MIN_GRID_RES = 100
+MIN_GRID_CELL_SIZE_M = 1.0
+GRID_CELLS_PER_SAMPLE_SPACING = 10
+MAX_GRID_CELLS = int(os.getenv("KRIGING_MAX_GRID_CELLS", "250000"))
+
+
+def choose_grid_resolution(polygon_gdf, n_points, dpi=100, width_in=8, max_cells=MAX_GRID_CELLS):
+    """
+    Pick the number of grid cells per side for kriging a field.
+
+    The resolution follows the sample spacing over the field's projected area,
+    is capped by the output size (``width_in`` inches at ``dpi``) and does not
+    drop below MIN_GRID_RES. The ``max_cells`` budget is applied last, so a
+    smaller budget can go below MIN_GRID_RES (but not below 2 cells per side).
+    """
+    max_res = max(2, math.isqrt(max_cells))
+    projected = polygon_gdf
+    if polygon_gdf.crs is not None and polygon_gdf.crs.is_geographic:
+        projected = polygon_gdf.to_crs(polygon_gdf.estimate_utm_crs())
+
+    xmin, ymin, xmax, ymax = projected.total_bounds
+    side = max(xmax - xmin, ymax - ymin)
+    area = projected.geometry.area.sum()
+    if not (side > 0 and area > 0) or n_points < 1:
+        return min(MIN_GRID_RES, max_res)
+
+    sample_spacing = math.sqrt(area / n_points)
+    cell_size = max(sample_spacing / GRID_CELLS_PER_SAMPLE_SPACING, MIN_GRID_CELL_SIZE_M)
+
+    grid_res = max(MIN_GRID_RES, min(math.ceil(side / cell_size), int(dpi * width_in)))
+    return min(grid_res, max_res)
+
+
+def polygon_grid_mask(polygon_gdf, bounds, shape):
+    """Boolean grid that is True for the cells inside the polygons, as drawn on the maps"""
+    rows, cols = shape
+    xmin, ymin, xmax, ymax = bounds
+    pixel_width = (xmax - xmin) / (cols - 1)
+    pixel_height = (ymax - ymin) / (rows - 1)
+    affine = Affine(pixel_width, 0, xmin, 0, pixel_height, ymin)
+
+    shapes = [mapping(geom) for geom in polygon_gdf.geometry]
+    return geometry_mask(geometries=shapes, transform=affine, invert=True, out_shape=shape)
+
+
+def _execute_inside(OK, xi, yi, inside=None):
+    """Solve the kriging system only at the grid cells where ``inside`` is True; others are NaN"""
+    if inside is None:
+        inside = np.ones(xi.shape, dtype=bool)
+    zi = np.full(inside.shape, np.nan)
+    if inside.any():
+        values, _ = OK.execute('points', xi[inside], yi[inside])
+        zi[inside] = np.ma.getdata(values)
+    return zi
+
+
+def _kriging_coordinates(xi, yi, grid_transform):
+    """Grid coordinates in the CRS of the sample points"""
+    if grid_transform is None:
+        return xi, yi
+    kx, ky = grid_transform(xi, yi)
+    return np.asarray(kx), np.asarray(ky)
+
+
+def kriging_interpolation(x, y, z, xmin, xmax, ymin, ymax, grid_res=500, variogram_model='linear',
+                          n_neighbors=None, tile_workers=None, mask=None, grid_transform=None,
+                          variogram_parameters=None):
+    """
+    Perform kriging interpolation over custom extent - exact same as notebook.
+
+    With ``n_neighbors`` set (or automatically for LOCAL_KRIGING_MIN_POINTS or
+    more points) the grid is kriged tile by tile from nearby points only, see
+    local_kriging_interpolation. A boolean ``mask`` of the grid's shape (see
+    polygon_grid_mask) restricts kriging to the cells where it is True and
+    leaves NaN everywhere else. ``grid_transform(xi, yi)`` maps grid
+    coordinates into the CRS of x/y, e.g. a lon/lat grid onto points in
+    metres; the returned xi/yi stay in the grid's own CRS. Fitted
+    ``variogram_parameters`` (see get_variogram) skip the variogram fit.
+    """
+    if n_neighbors is None and len(x) >= LOCAL_KRIGING_MIN_POINTS:
+        n_neighbors = LOCAL_KRIGING_NEIGHBORS
+    if n_neighbors is not None and n_neighbors < len(x):
+        return local_kriging_interpolation(x, y, z, xmin, xmax, ymin, ymax, grid_res, variogram_model,
+                                           n_neighbors=n_neighbors, tile_workers=tile_workers, mask=mask,
+                                           grid_transform=grid_transform,
+                                           variogram_parameters=variogram_parameters)
+
+    xi = np.linspace(xmin, xmax, grid_res)
+    yi = np.linspace(ymin, ymax, grid_res)
+    xi, yi = np.meshgrid(xi, yi)
+
+    OK = OrdinaryKriging(
+        x, y, z,
+        variogram_model=variogram_model,
+        variogram_parameters=variogram_parameters,
+        verbose=False,
+        enable_plotting=False
+    )
+
+    if mask is not None or grid_transform is not None:
+        kx, ky = _kriging_coordinates(xi, yi, grid_transform)
+        return xi, yi, _execute_inside(OK, kx, ky, mask)
+
+    zi, _ = OK.execute('grid', xi[0], yi[:, 0])
+    return xi, yi, zi
+
+
+def _krige_tile(x, y, z, tree, tile_x, tile_y, n_neighbors, variogram_model, variogram_parameters,
+                tile_mask=None):
+    """Krige one grid tile (2-D coordinate arrays) from the points nearest to its center and corners"""
+    # Corner neighborhoods overlap with the adjacent tiles', which keeps seams smooth
+    probes = [(tile_x.mean(), tile_y.mean()),
+              (tile_x[0, 0], tile_y[0, 0]), (tile_x[0, -1], tile_y[0, -1]),
+              (tile_x[-1, 0], tile_y[-1, 0]), (tile_x[-1, -1], tile_y[-1, -1])]
+    _, neighbors = tree.query(probes, k=n_neighbors)
+    neighbors = np.unique(neighbors)
+
+    OK = OrdinaryKriging(
+        x[neighbors], y[neighbors], z[neighbors],
+        variogram_model=variogram_model,
+        variogram_parameters=variogram_parameters,
+        verbose=False,
+        enable_plotting=False
+    )
+    return _execute_inside(OK, tile_x, tile_y, tile_mask)
+
+
+def local_kriging_interpolation(x, y, z, xmin, xmax, ymin, ymax, grid_res=500, variogram_model='linear',
+                                n_neighbors=LOCAL_KRIGING_NEIGHBORS, tile_size=LOCAL_KRIGING_TILE_SIZE,
+                                tile_workers=None, mask=None, grid_transform=None,
+                                variogram_parameters=None):
+    """
+    Moving-window kriging for large point sets.
+
+    The variogram is fitted once for the whole field (unless
+    ``variogram_parameters`` are given), then every
+    ``tile_size`` x ``tile_size`` block of the grid solves a small system over
+    the ``n_neighbors`` nearest samples (found with a KD-tree). Tiles are
+    kriged in a thread pool of ``tile_workers`` threads (default: CPU count).
+    With a ``mask``, tiles with no cell inside it are skipped entirely.
+    Returns the same (xi, yi, zi) as kriging_interpolation.
+    """
+    x, y, z = (np.asarray(values, dtype=float) for values in (x, y, z))
+    xi, yi = np.meshgrid(np.linspace(xmin, xmax, grid_res), np.linspace(ymin, ymax, grid_res))
+    kx, ky = _kriging_coordinates(xi, yi, grid_transform)
+
+    if variogram_parameters is None:
+        variogram_parameters = fit_variogram_parameters(x, y, z, variogram_model)
+    tree = cKDTree(np.column_stack([x, y]))
+    n_neighbors = min(n_neighbors, len(x))
+
+    zi = np.full((grid_res, grid_res), np.nan)
+    tiles = [(row, col) for row in range(0, grid_res, tile_size) for col in range(0, grid_res, tile_size)
+             if mask is None or mask[row:row + tile_size, col:col + tile_size].any()]
+
+    def krige(tile):
+        row, col = tile
+        tile_mask = None if mask is None else mask[row:row + tile_size, col:col + tile_size]
+        window = (slice(row, row + tile_size), slice(col, col + tile_size))
+        zi[window] = _krige_tile(x, y, z, tree, kx[window], ky[window],
+                                 n_neighbors, variogram_model, variogram_parameters, tile_mask)
+
+    workers = max(1, int(tile_workers or os.cpu_count() or 1))
+    if workers == 1:
+        for tile in tiles:
+            krige(tile)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first tile error, if any
+            list(executor.map(krige, tiles))
+
+    return xi, yi, zi
+
+
+def get_kriged_surface(x, y, z, polygon_gdf, compiled, grid_res=500, variogram_model='auto',
+                       cache_key=None, cache=KRIGING_CACHE, tile_workers=None, kriging_crs=None,
+                       variogram=None):
+    """
+    Krige the values over the polygon bounds and classify the surface.
+
+    The variogram comes from ``variogram`` when given, otherwise from the
+    variogram cache (get_variogram with ``variogram_model``, 'auto' selects
+    the best model by cross-validation).
+
+    The grid follows the polygons' CRS. With ``kriging_crs`` (see
+    prepare_field) x/y are in that metric CRS and grid cells are projected
+    into it before kriging. Returns (zi, categories, bounds); zi is NaN
+    outside the polygons. When a cache key (see kriging_cache_key) is given
+    the surface is looked up in, and stored to, the kriging cache.
+    """
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Get polygon bounds
+    xmin, ymin, xmax, ymax = polygon_gdf.total_bounds
+
+    # Only cells inside the field are kriged; the rest is painted white anyway
+    inside = polygon_grid_mask(polygon_gdf, (xmin, ymin, xmax, ymax), (grid_res, grid_res))
+
+    # Perform kriging with higher resolution for better smoothing
+    grid_transform = None
+    if kriging_crs is not None and polygon_gdf.crs is not None and polygon_gdf.crs != kriging_crs:
+        grid_transform = get_transformer(polygon_gdf.crs, kriging_crs).transform
+
+    if variogram is None:
+        variogram = get_variogram(x, y, z, variogram_model)
+
+    _, _, zi = kriging_interpolation(x, y, z, xmin, xmax, ymin, ymax, grid_res=grid_res,
+                                     variogram_model=variogram.model, tile_workers=tile_workers,
+                                     mask=inside, grid_transform=grid_transform,
+                                     variogram_parameters=variogram.parameters)
+
+    # Classify interpolated values into an integer category raster
+    categories, _ = classify_grid(compiled, zi)
+
+    if cache_key is not None:
+        return cache.put(cache_key, zi, categories, (xmin, ymin, xmax, ymax))
+    return zi, categories, (xmin, ymin, xmax, ymax)
+
+
+def create_classified_raster(x, y, z, polygon_gdf, compiled, palette, grid_res=500,
+                             cache_key=None, surface=None, kriging_crs=None):
+    """
+    Krige the values over the polygon bounds and color them by classification.
+
+    ``palette`` holds one RGB row per label of ``compiled`` (see
+    get_classification_palette). A precomputed ``surface`` from
+    get_kriged_surface skips kriging. Returns the RGB image, the bounds and the grid.
+    """
+    if surface is None:
+        surface = get_kriged_surface(x, y, z, polygon_gdf, compiled, grid_res, cache_key=cache_key,
+                                     kriging_crs=kriging_crs)
+    _, categories, (xmin, ymin, xmax, ymax) = surface
+
+    # Create RGB image with a single palette lookup
+    rgb_image = palette[categories]
+
+    rows, cols = categories.shape
+    xi, yi = np.meshgrid(np.linspace(xmin, xmax, cols), np.linspace(ymin, ymax, rows))
+
+    # Apply polygon mask to set areas outside polygon to white (like in notebook)
+    mask = polygon_grid_mask(polygon_gdf, (xmin, ymin, xmax, ymax), categories.shape)
+    rgb_image[~mask] = 255  # White outside polygon
+
+    return rgb_image, (xmin, ymin, xmax, ymax), xi, yi
+
+
+def render_report_map(rgb_image, bounds, polygon_gdf, title, legend_entries, legend_title, output_path):
+    """
+    Draw a report kriging map and save it as a 300 DPI PNG.
+
+    ``legend_entries`` is a list of (color, label) pairs already translated.
+    ``output_path`` may be a file path or a binary file object.
+    """
+    # Calculate proper aspect ratio based on coordinate ranges
+    xmin, ymin, xmax, ymax = bounds
+    x_range = xmax - xmin
+    y_range = ymax - ymin
+
+    # Calculate aspect ratio to maintain proper proportions
+    if y_range > 0:
+        aspect_ratio = x_range / y_range
+        # Limit aspect ratio to prevent extreme stretching
+        aspect_ratio = max(0.5, min(2.0, aspect_ratio))
+        fig_width = 8
+        fig_height = fig_width / aspect_ratio
+    else:
+        fig_width, fig_height = 8, 6
+
+    # Create figure with proper aspect ratio
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+
+    try:
+        # Display the kriging map
+        ax.imshow(rgb_image, origin="lower", extent=(xmin, xmax, ymin, ymax))
+
+        # Add polygon boundary
+        polygon_gdf.boundary.plot(ax=ax, edgecolor="black", linewidth=1.0)
+
+        # Add plot type labels if available
+        if 'plot_type' in polygon_gdf.columns:
+            for _, row in polygon_gdf.iterrows():
+                if not row.geometry.is_empty and not row.geometry.centroid.is_empty:
+                    x_text, y_text = row.geometry.centroid.coords[0]
+                    ax.text(x_text, y_text, row['plot_type'],
+                            ha='center', va='center', fontsize=14,
+                            fontweight='bold', color='white',
+                            bbox=dict(boxstyle="round,pad=0.4", facecolor='black', alpha=0.8))
+
+        ax.set_title(title, fontsize=14, fontweight='bold', pad=12)
+        ax.set_xlabel("Longitude", fontsize=12)
+        ax.set_ylabel("Latitude", fontsize=12)
+
+        # Add legend with classification levels, ranges, and units
+        if legend_entries:
+            legend_handles = [Patch(color=color, label=label) for color, label in legend_entries]
+            legend = ax.legend(handles=legend_handles, labels=[label for _, label in legend_entries],
+                               loc='lower center', bbox_to_anchor=(0.5, -0.25),
+                               ncol=min(3, len(legend_handles)), fontsize=14,
+                               frameon=True, fancybox=True, shadow=True,
+                               title=legend_title, title_fontsize=16)
+            legend.get_frame().set_facecolor('white')
+            legend.get_frame().set_alpha(0.9)
+
+        # Increase tick label font sizes
+        ax.tick_params(axis='both', which='major', labelsize=10)
+
+        # Adjust layout with more space for legend
+        fig.tight_layout(pad=1.2)
+
+        fig.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white', pad_inches=0.6)
+    finally:
+        plt.close(fig)
+
+
+def png_size(image):
+    """(width, height) in pixels of PNG bytes, read from the IHDR header"""
+    return struct.unpack('>II', image[16:24])
+
+
+def render_map_png(rgb_image, bounds, polygon_gdf, title, legend_entries, legend_title):
+    """Render a kriging map with render_report_map and return the PNG bytes"""
+    buffer = io.BytesIO()
+    render_report_map(rgb_image, bounds, polygon_gdf, title, legend_entries, legend_title, buffer)
+    return buffer.getvalue()
+
+
+def generate_report_map(job):
+    """
+    Krige, classify and render one map described by a job dict.
+
+    Runs in worker processes, so the job only carries picklable data: the
+    parameter name, x/y/z arrays (in ``kriging_crs`` when given), polygon
+    GeoDataFrame, compiled ranges, palette, grid resolution, cache keys, title
+    and legend, plus the cached surface and variogram when the parent
+    already had them. The result holds the PNG bytes under ``image`` and
+    their pixel size under ``width`` and ``height``.
+    """
+    surface, variogram = job.get('surface'), job.get('variogram')
+    if surface is None:
+        if variogram is None:
+            variogram = get_variogram(job['x'], job['y'], job['z'])
+        surface = get_kriged_surface(job['x'], job['y'], job['z'], job['polygon_gdf'],
+                                     job['compiled'], job['grid_res'], cache_key=job.get('cache_key'),
+                                     tile_workers=job.get('tile_workers'), kriging_crs=job.get('kriging_crs'),
+                                     variogram=variogram)
+    rgb_image, bounds, _, _ = create_classified_raster(
+        job['x'], job['y'], job['z'], job['polygon_gdf'],
+        job['compiled'], job['palette'], job['grid_res'], surface=surface
+    )
+
+    image = render_map_png(rgb_image, bounds, job['polygon_gdf'], job['title'],
+                           job['legend_entries'], job['legend_title'])
+
+    width, height = png_size(image)
+
+    return {
+        'parameter': job['parameter'],
+        'title': job['title'],
+        'image': image,
+        'width': width,
+        'height': height,
+        # Handed back so the parent process can keep them in its own caches
+        'cache_key': job.get('cache_key'),
+        'image_key': job.get('image_key'),
+        'surface': surface,
+        'variogram': variogram
+    }
+
+
+def get_kriging_workers(max_workers=None):
+    """Number of kriging worker processes: explicit value, else KRIGING_MAX_WORKERS, else the CPU count"""
+    if max_workers is None:
+        max_workers = os.getenv("KRIGING_MAX_WORKERS") or os.cpu_count() or 1
+    return max(1, int(max_workers))
+
+
+def store_map_result(job, result):
+    """
+    Move the cacheable parts of a generate_report_map result into this
+    process's kriging, variogram and map image caches.
+    """
+    cache_key, surface = result.pop('cache_key'), result.pop('surface')
+    if cache_key is not None and KRIGING_CACHE.get(cache_key) is None:
+        KRIGING_CACHE.put(cache_key, *surface)
+
+    variogram = result.pop('variogram')
+    if variogram is not None:
+        store_variogram(variogram_cache_key(job['x'], job['y'], job['z'], 'auto'), variogram)
+
+    MAP_IMAGE_CACHE.put(result.pop('image_key'), result['image'])
+    return result
+
+
+def cached_map_result(job):
+    """The map of a job straight from the map image cache, or None when it still has to be rendered"""
+    image = MAP_IMAGE_CACHE.get(job.get('image_key'))
+    if image is None:
+        return None
+    width, height = png_size(image)
+    return {'parameter': job['parameter'], 'title': job['title'], 'image': image, 'width': width, 'height': height}
+
+
+def _worker_job(job):
+    # Maps already run in parallel, so each map runs its tiles sequentially
+    return dict(job, tile_workers=1)
+
+
+def run_kriging_jobs(jobs, max_workers=None, on_result=None):
+    """
+    Generate report maps for a list of jobs, fanning out to a process pool when
+    more than one worker is available.
+
+    ``on_result(result)`` is called as soon as each map finishes. The returned
+    list keeps the order of ``jobs``; a failing parameter is reported and
+    skipped without affecting the others. Maps already in the image cache are
+    not rendered again. Surfaces, variograms and images computed by workers
+    are added to this process's caches.
+    """
+    results = [None] * len(jobs)
+    pending = []
+    for i, job in enumerate(jobs):
+        results[i] = cached_map_result(job)
+        if results[i] is None:
+            pending.append(i)
+        elif on_result is not None:
+            on_result(results[i])
+
+    workers = min(get_kriging_workers(max_workers), len(pending))
+
+    def collect(i, compute):
+        try:
+            results[i] = compute()
+        except Exception as e:
+            print(f"Error generating kriging map for {jobs[i]['parameter']}: {str(e)}")
+            return
+
+        store_map_result(jobs[i], results[i])
+        if on_result is not None:
+            on_result(results[i])
+
+    if workers <= 1:
+        for i in pending:
+            collect(i, lambda: generate_report_map(jobs[i]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(generate_report_map, _worker_job(jobs[i])): i for i in pending}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+
+    return [result for result in results if result is not None]
+
+
+def iter_kriging_jobs(jobs, max_workers=None):
+    """
+    Generate report maps one at a time, in the order of ``jobs``.
+
+    Only ``max_workers`` maps are computed ahead of the one being consumed, so
+    memory is bounded by the worker count instead of the number of maps.
+    Cached maps are yielded without rendering; failing jobs are reported and
+    skipped.
+    """
+    jobs = list(jobs)
+    workers = min(get_kriging_workers(max_workers), len(jobs))
+
+    def result_of(job, compute):
+        cached = cached_map_result(job)
+        if cached is not None:
+            return cached
+        try:
+            return store_map_result(job, compute())
+        except Exception as e:
+            print(f"Error generating kriging map for {job['parameter']}: {str(e)}")
+            return None
+
+    if workers <= 1:
+        for job in jobs:
+            result = result_of(job, lambda: generate_report_map(job))
+            if result is not None:
+                yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit(job):
+            if MAP_IMAGE_CACHE.get(job.get('image_key')) is not None:
+                return job, None
+            return job, executor.submit(generate_report_map, _worker_job(job))
+
+        ahead = deque(submit(job) for job in jobs[:workers])
+        remaining = iter(jobs[workers:])
+        while ahead:
+            job, future = ahead.popleft()
+            next_job = next(remaining, None)
+            if next_job is not None:
+                ahead.append(submit(next_job))
+
+            # A map evicted from the image cache since submission is rendered here
+            result = result_of(job, future.result if future is not None else lambda: generate_report_map(job))
+            if result is not None:
+                yield result
@@ -0,0 +1,208 @@
+"""
+Content-addressed cache for kriged surfaces.
+
+Entries are keyed by a hash of the sample points, the field polygons, the
+parameter, the sampling filters, the grid resolution, the variogram model and
+the classification ranges, and hold the interpolated grid, its category
+raster and the grid bounds. Interactive maps and report exports therefore
+reuse each other's surfaces.
+
+There is an in-memory LRU tier bounded by size and an optional directory of
+``.npz`` files that worker processes and later sessions can share. Both are
+configured through environment variables:
+
+- KRIGING_CACHE_MB: memory tier size (default 256, 0 disables it)
+- KRIGING_CACHE_DIR: directory for the disk tier (disabled when unset)
+- KRIGING_CACHE_DISK_MB: disk tier size (default 1024)
+
+Rendered map PNGs are kept in a separate size-bounded LRU
+(MAP_IMAGE_CACHE_MB, default 64) so each map is drawn once and shared by the
+app, the PNG download and the PDF/DOCX reports.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.spatial import geometry_digest
+
+
+def _hash_array(digest, values):
+    """Feed an array's float64 bytes into a hash"""
+    digest.update(np.ascontiguousarray(np.asarray(values, dtype=float)).tobytes())
+
+
+def kriging_cache_key(x, y, z, polygon_gdf, parameter, purpose_filter=None, depth_filter=None,
+                      grid_res=500, variogram_model='auto', compiled=None):
+    """Build the cache key for one kriged surface"""
+    points_digest = hashlib.sha256()
+    for values in (x, y, z):
+        _hash_array(points_digest, values)
+
+    key_digest = hashlib.sha256()
+    for part in (points_digest.hexdigest(), geometry_digest(polygon_gdf), parameter, purpose_filter,
+                 depth_filter, grid_res, variogram_model, compiled.ranges if compiled else None):
+        key_digest.update(repr(part).encode())
+        key_digest.update(b'\0')
+    return key_digest.hexdigest()
+
+
+class KrigingCache:
+    """LRU cache of (zi, categories, bounds) with an optional on-disk .npz tier"""
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, cache_dir=None, max_disk_bytes=1024 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return the cached (zi, categories, bounds) for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._store_memory(key, entry)
+        return entry
+
+    def put(self, key, zi, categories, bounds):
+        """Store a surface in both tiers"""
+        entry = (np.asarray(np.ma.getdata(zi)), np.asarray(categories), tuple(float(b) for b in bounds))
+        self._store_memory(key, entry)
+        self._write_disk(key, entry)
+        return entry
+
+    def clear(self):
+        """Drop every in-memory entry (the disk tier is left alone)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store_memory(self, key, entry):
+        nbytes = entry[0].nbytes + entry[1].nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = entry
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _, (old_zi, old_categories, _) = self._entries.popitem(last=False)
+                self._size -= old_zi.nbytes + old_categories.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = (data['zi'], data['categories'], tuple(data['bounds'].tolist()))
+            os.utime(path)  # Mark as recently used for eviction
+            return entry
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        zi, categories, bounds = entry
+        try:
+            # Write to a temporary file first so concurrent readers never see partial files
+            # (.tmp, so _evict_disk in another process never counts or removes it)
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, zi=zi, categories=categories, bounds=np.array(bounds))
+            os.replace(temp_path, self._path(key))
+            self._evict_disk()
+        except OSError as e:
+            print(f"Could not write kriging cache entry: {e}")
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue  # Evicted by another process since listdir
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+
+def map_image_key(cache_key, title, legend_entries, legend_title):
+    """Build the cache key for one rendered map: its surface plus the (translated) text drawn on it"""
+    digest = hashlib.sha256()
+    for part in (cache_key, title, legend_entries, legend_title):
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class MapImageCache:
+    """LRU cache of rendered map PNG bytes bounded by their total size"""
+
+    def __init__(self, max_bytes=64 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached PNG bytes for a key, or None"""
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """Store PNG bytes, evicting the least recently used maps beyond max_bytes"""
+        if key is None or len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._size -= len(self._images.pop(key))
+            self._images[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes:
+                _, old_image = self._images.popitem(last=False)
+                self._size -= len(old_image)
+
+    def clear(self):
+        """Drop every cached map"""
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+
+KRIGING_CACHE = KrigingCache(
+    max_bytes=int(float(os.getenv("KRIGING_CACHE_MB", "256")) * 1024 ** 2),
+    cache_dir=os.getenv("KRIGING_CACHE_DIR") or None,
+    max_disk_bytes=int(float(os.getenv("KRIGING_CACHE_DISK_MB", "1024")) * 1024 ** 2),
+)
+
+MAP_IMAGE_CACHE = MapImageCache(int(float(os.getenv("MAP_IMAGE_CACHE_MB", "64")) * 1024 ** 2))
@@ -0,0 +1,170 @@
+"""
+Local Parquet snapshots of field data.
+
+Each field's combined soil samples and its boundaries are kept as Parquet (the
+boundaries as GeoParquet) next to a small JSON record of the data version
+they were read at: a hash of the SQL that produced them plus, for samples, the
+latest ``sample_last_updated_at`` and the row count reported by the database.
+soil_core serves a field from its snapshot while it is fresh, asks the
+database for the current version once it is not (re-reading only the fields
+whose version changed), and falls back to the snapshot when the database
+cannot be reached. Configured through environment variables:
+
+- FIELD_SNAPSHOT_DIR: directory of the snapshots (disabled when unset)
+- FIELD_SNAPSHOT_MAX_AGE: seconds a snapshot is served without checking the
+  database (default 3600)
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+# ``data`` is the DataFrame/GeoDataFrame (None for a field stored as having no
+# rows); ``meta`` holds ``version``, ``written_at``, ``checked_at`` and the
+# version details the snapshot was written with.
+Snapshot = namedtuple('Snapshot', ['data', 'meta'])
+
+
+class FieldSnapshotStore:
+    """Parquet snapshots of per-field DataFrames, one directory per field"""
+
+    def __init__(self, root=None, max_age=3600):
+        self.root = root
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.root)
+
+    def get(self, field_id, kind, version):
+        """The snapshot of one field's data, or None when missing, unreadable or of another version"""
+        if not self.enabled:
+            return None
+        meta = self._read_meta(field_id, kind)
+        if meta is None or meta.get('version') != version:
+            return None
+        if meta.get('empty'):
+            return Snapshot(None, meta)
+        try:
+            if meta.get('geo'):
+                import geopandas as gpd
+                data = gpd.read_parquet(self._path(field_id, kind, 'parquet'))
+            else:
+                data = pd.read_parquet(self._path(field_id, kind, 'parquet'))
+        except (OSError, ValueError) as e:
+            print(f"Could not read snapshot of field {field_id} ({kind}): {e}")
+            return None
+        return Snapshot(data, meta)
+
+    def put(self, field_id, kind, data, version, **details):
+        """Store one field's data (None stores an empty snapshot); returns its metadata"""
+        now = time.time()
+        meta = dict(details, version=version, written_at=now, checked_at=now, empty=data is None,
+                    geo=type(data).__name__ == 'GeoDataFrame')
+        if not self.enabled:
+            return meta
+        try:
+            os.makedirs(self._field_dir(field_id), exist_ok=True)
+            if data is not None:
+                self._write_atomic(self._path(field_id, kind, 'parquet'),
+                                   lambda path: _parquet_safe(data).to_parquet(path, index=False))
+            # The metadata goes last: a snapshot counts as written once it points at its data
+            self._write_meta(field_id, kind, meta)
+        except Exception as e:
+            # A failed snapshot must never fail the load it came from
+            print(f"Could not write snapshot of field {field_id} ({kind}): {e}")
+        return meta
+
+    def touch(self, field_id, kind):
+        """Mark a snapshot as just checked against the database"""
+        meta = self._read_meta(field_id, kind)
+        if meta is not None:
+            meta['checked_at'] = time.time()
+            try:
+                self._write_meta(field_id, kind, meta)
+            except OSError as e:
+                print(f"Could not update snapshot of field {field_id} ({kind}): {e}")
+
+    def is_fresh(self, snapshot):
+        """Whether a snapshot was checked against the database less than max_age seconds ago"""
+        return time.time() - snapshot.meta.get('checked_at', 0) < self.max_age
+
+    def expire(self):
+        """Make every snapshot stale so the next load checks the database (snapshots stay for offline use)"""
+        for field_id in self.fields():
+            for name in os.listdir(self._field_dir(field_id)):
+                if name.endswith('.json'):
+                    kind = name[:-len('.json')]
+                    meta = self._read_meta(field_id, kind)
+                    if meta is not None:
+                        meta['checked_at'] = 0
+                        self._write_meta(field_id, kind, meta)
+
+    def fields(self):
+        """Ids of the fields that have snapshots"""
+        if not self.enabled or not os.path.isdir(self.root):
+            return []
+        return sorted(int(name[len('field_'):]) for name in os.listdir(self.root)
+                      if name.startswith('field_') and name[len('field_'):].isdigit())
+
+    def clear(self):
+        """Delete every snapshot"""
+        for field_id in self.fields():
+            shutil.rmtree(self._field_dir(field_id), ignore_errors=True)
+
+    def _field_dir(self, field_id):
+        return os.path.join(self.root, f"field_{int(field_id)}")
+
+    def _path(self, field_id, kind, extension):
+        return os.path.join(self._field_dir(field_id), f"{kind}.{extension}")
+
+    def _read_meta(self, field_id, kind):
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(field_id, kind, 'json'), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, field_id, kind, meta):
+        with self._lock:
+            self._write_atomic(self._path(field_id, kind, 'json'),
+                               lambda path: _write_json(path, meta))
+
+    def _write_atomic(self, path, write):
+        # Write to a temporary file first so concurrent readers never see partial files
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def _write_json(path, meta):
+    with open(path, 'w') as file:
+        json.dump(meta, file)
+
+
+def _parquet_safe(df):
+    """Copy of df with driver memoryviews (bytea columns) turned into bytes, which Parquet can store"""
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype == object and df[column].map(lambda value: isinstance(value, memoryview)).any():
+            df[column] = df[column].map(lambda value: bytes(value) if isinstance(value, memoryview) else value)
+    return df
+
+
+FIELD_SNAPSHOTS = FieldSnapshotStore(
+    root=os.getenv("FIELD_SNAPSHOT_DIR") or None,
+    max_age=int(os.getenv("FIELD_SNAPSHOT_MAX_AGE", "3600")),
+)
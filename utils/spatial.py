@@ -0,0 +1,107 @@
+"""
+Spatial preparation for kriging.
+
+Sample points usually arrive in EPSG:4326, where one unit of x and one unit of
+y are different ground distances, so kriging and variogram fitting on raw
+lon/lat is distorted. prepare_field picks a local metric CRS (the field's UTM
+zone) once per field and caches the projected sample coordinates and polygon
+geometries, so repeated maps and plots never reproject the same data again.
+Only geometries are cached: attributes always come from the caller's frame.
+Rasters stay on a grid in the display CRS; only the grid coordinates are
+projected when they are kriged.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+# Projected field data: ``points_x``/``points_y`` follow the row order of the
+# points GeoDataFrame and are in ``kriging_crs``; ``polygons`` are aligned to
+# the points' CRS for display and ``polygons_metric`` are in ``kriging_crs``.
+SpatialField = namedtuple('SpatialField', ['points_x', 'points_y', 'polygons', 'polygons_metric', 'kriging_crs'])
+
+# Number of prepared fields and reprojected geometry arrays kept in memory
+SPATIAL_CACHE_SIZE = 16
+
+_spatial_cache = OrderedDict()
+_spatial_cache_lock = threading.Lock()
+
+
+def geometry_digest(gdf):
+    """Hex digest of a GeoDataFrame's CRS and geometries (coordinates and structure)"""
+    geometries = np.asarray(gdf.geometry.values)
+    digest = hashlib.sha256(str(gdf.crs).encode())
+    digest.update(shapely.get_type_id(geometries).tobytes())
+    digest.update(shapely.get_num_coordinates(geometries).tobytes())
+    digest.update(np.ascontiguousarray(shapely.get_coordinates(geometries)).tobytes())
+    return digest.hexdigest()
+
+
+def _cached(key, compute):
+    """Return the cached value for key, computing and storing it on a miss"""
+    with _spatial_cache_lock:
+        if key in _spatial_cache:
+            _spatial_cache.move_to_end(key)
+            return _spatial_cache[key]
+
+    value = compute()
+
+    with _spatial_cache_lock:
+        _spatial_cache[key] = value
+        while len(_spatial_cache) > SPATIAL_CACHE_SIZE:
+            _spatial_cache.popitem(last=False)
+    return value
+
+
+@lru_cache(maxsize=32)
+def get_transformer(src_crs, dst_crs):
+    """Cached x/y-ordered transformer between two CRSs"""
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+def get_metric_crs(gdf):
+    """The GeoDataFrame's CRS when it is projected, otherwise its local UTM zone"""
+    if gdf.crs is None or not gdf.crs.is_geographic:
+        return gdf.crs
+    return gdf.estimate_utm_crs()
+
+
+def to_crs_cached(gdf, crs):
+    """gdf.to_crs(crs), reusing the reprojected geometries of GeoDataFrames with the same geometries"""
+    if crs is None or gdf.crs is None or gdf.crs == crs:
+        return gdf
+    geometries = _cached(('to_crs', geometry_digest(gdf), str(crs)), lambda: gdf.geometry.to_crs(crs).values)
+    # A copy, so changing the returned frame's geometries never reaches the cache
+    return gdf.set_geometry(geometries.copy())
+
+
+def prepare_field(points_gdf, polygon_gdf):
+    """
+    Project a field's sample points and polygons to a local metric CRS once.
+
+    The projected coordinates and CRS are cached by the content of both
+    GeoDataFrames, so calling this for every map of the same field costs a hash
+    of the coordinates. The polygons are polygon_gdf's own rows with cached
+    geometries, so their attributes are always the caller's.
+    """
+    polygons = to_crs_cached(polygon_gdf, points_gdf.crs)
+
+    def compute():
+        kriging_crs = get_metric_crs(polygons)
+        points_x = points_gdf.geometry.x.to_numpy(dtype=float)
+        points_y = points_gdf.geometry.y.to_numpy(dtype=float)
+        if kriging_crs is not None and points_gdf.crs is not None and points_gdf.crs != kriging_crs:
+            points_x, points_y = get_transformer(points_gdf.crs, kriging_crs).transform(points_x, points_y)
+        points_x, points_y = np.array(points_x), np.array(points_y)
+        # Shared by every caller, so read-only
+        points_x.setflags(write=False)
+        points_y.setflags(write=False)
+        return points_x, points_y, kriging_crs
+
+    points_x, points_y, kriging_crs = _cached(
+        ('field', geometry_digest(points_gdf), geometry_digest(polygon_gdf)), compute)
+    return SpatialField(points_x, points_y, polygons, to_crs_cached(polygons, kriging_crs), kriging_crs)